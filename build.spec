@@ -61,6 +61,8 @@ hidden_imports = [
     'cv2',
     'numpy',
     'pyaudio',
+    'vosk',
+    'pyautogui',
     'PIL',
     'PIL.ImageTk',
     'dlib',
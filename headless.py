@@ -0,0 +1,128 @@
+"""
+无界面模式：不加载 Tkinter，直接运行监控引擎 (后台服务 / 测试机 / CI)
+
+用法:
+    python -m headless [--camera 视频文件] [--mic WAV文件] [--duration 秒] [--dry-run] [--exit-on-trigger] [--metrics] [--profile 秒]
+
+配置读取软件目录下的 settings.json (与界面版共用)。
+--camera / --mic 用视频文件、WAV 文件代替摄像头和麦克风，无需任何硬件即可完整运行。
+
+信号控制:
+    Linux / macOS: SIGUSR1 暂停, SIGUSR2 恢复, SIGINT (Ctrl+C) / SIGTERM 停止
+    Windows:       Ctrl+Break 暂停/恢复切换, Ctrl+C 停止
+
+退出时输出一行 JSON 汇总 (触发次数、合并次数、各启动阶段耗时，开启统计时还包括各阶段耗时)，便于脚本判断结果。
+"""
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import threading
+
+from settings_manager import SettingsManager, BASE_DIR
+from modules.monitor import MonitorThread
+from modules.audio_source import WavFileSource
+from modules.model_registry import terminate_pyaudio
+from modules.profiler import start_profiler
+
+
+def log(msg):
+    print(f"[{time.strftime('%H:%M:%S')}] {msg}", flush=True)
+
+
+def install_signal_handlers(monitor):
+    def handle_stop(signum, frame):
+        log(f"收到信号 {signal.Signals(signum).name}，正在停止...")
+        monitor.stop()
+
+    signal.signal(signal.SIGINT, handle_stop)
+    if hasattr(signal, 'SIGTERM'):
+        signal.signal(signal.SIGTERM, handle_stop)
+
+    if hasattr(signal, 'SIGUSR1'):
+        signal.signal(signal.SIGUSR1, lambda signum, frame: monitor.pause())
+        signal.signal(signal.SIGUSR2, lambda signum, frame: monitor.resume())
+    elif hasattr(signal, 'SIGBREAK'):
+        # Windows 没有 SIGUSR1/2，用 Ctrl+Break 切换暂停
+        signal.signal(signal.SIGBREAK,
+                      lambda signum, frame: monitor.resume() if monitor.paused else monitor.pause())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="摸鱼神器 - 无界面模式")
+    parser.add_argument("--camera", default=None, help="用视频文件代替摄像头")
+    parser.add_argument("--mic", default=None, help="用 WAV 文件代替麦克风 (按真实时间节奏回放)")
+    parser.add_argument("--duration", type=float, default=0, help="运行多少秒后自动停止，0 表示一直运行")
+    parser.add_argument("--dry-run", action="store_true", help="只记录触发，不执行保护动作")
+    parser.add_argument("--exit-on-trigger", action="store_true", help="第一次触发保护后停止")
+    parser.add_argument("--metrics", action="store_true", help="开启各阶段耗时统计 (同 metrics_enabled 配置)")
+    parser.add_argument("--profile", type=float, default=0,
+                        help="启动后进行多少秒的性能采样，结果保存在软件目录 (collapsed stack 格式)")
+    args = parser.parse_args()
+
+    settings = SettingsManager().settings
+    if args.metrics:
+        settings['metrics_enabled'] = True
+    triggers = []
+    finished = threading.Event()
+
+    def on_trigger(event=None):
+        triggers.append({
+            "source": event.source if event else None,
+            "reason": event.reason if event else None,
+            "confidence": event.confidence if event else None,
+            "latency_ms": round((time.monotonic() - event.timestamp) * 1000, 1) if event else None,
+        })
+        if args.dry_run:
+            log(f"[dry-run] 跳过保护动作: {settings.get('action_type', 'minimize')}")
+        else:
+            # 延迟导入：pyautogui 等只在真正执行保护时才需要
+            from modules.actions import trigger_protection
+            trigger_protection(settings.get('action_type', 'minimize'),
+                               settings.get('safe_app_path'),
+                               settings.get('fallback_url'),
+                               settings.get('whitelist_apps', []))
+        if args.exit_on_trigger:
+            monitor.stop()
+
+    audio_source = WavFileSource(args.mic, realtime=True) if args.mic else None
+    camera_source = os.path.abspath(args.camera) if args.camera else None
+
+    monitor = MonitorThread(settings, on_trigger, log, finished.set,
+                            camera_source=camera_source, audio_source=audio_source)
+    install_signal_handlers(monitor)
+    profiler = None
+    if args.profile > 0:
+        profiler = start_profiler(BASE_DIR, duration=args.profile,
+                                  interval_ms=int(settings.get('profiler_interval_ms', 10)), callback_log=log)
+    monitor.start()
+
+    deadline = time.monotonic() + args.duration if args.duration > 0 else None
+    # 主线程只负责等待 (信号处理函数在主线程中执行)
+    while not finished.wait(0.2):
+        if deadline is not None and time.monotonic() >= deadline:
+            log(f"已运行 {args.duration:g}s，停止监控")
+            monitor.stop()
+            deadline = None
+    monitor.join()
+    terminate_pyaudio()
+    if profiler is not None:
+        # 监控提前结束时不再等满采样时长
+        profiler.stop()
+        profiler.join()
+
+    dispatcher = monitor.dispatcher
+    print(json.dumps({
+        "triggers": triggers,
+        "coalesced": dispatcher.coalesced_count if dispatcher else 0,
+        "startup_ms": {name: round(t * 1000) for name, t in monitor.timer.phases.items()} if monitor.timer else {},
+        "metrics": monitor.metrics_snapshot,
+        "profile": profiler.output_path if profiler is not None else None,
+    }, ensure_ascii=False), flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,18 +2,19 @@ import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, Toplevel
 import threading
 import time
+
+# 进程启动时刻，用于统计界面显示耗时
+STARTUP_TIME = time.perf_counter()
+
 import os
-import sys
-import cv2
-from PIL import Image, ImageTk
 
 # ==============================================================================
 # 猴子补丁 (打包时用，解决 face_recognition 模型路径问题)
 # 强制告诉 face_recognition 库：模型文件就在 EXE 旁边的文件夹里
 # ==============================================================================
-import face_recognition_models
-
 # def fix_face_recognition_path():
+#     import face_recognition_models
+#
 #     # 1. 计算 EXE 所在的真实目录
 #     if getattr(sys, 'frozen', False):
 #         base_path = os.path.dirname(sys.executable)
@@ -42,38 +43,20 @@ import face_recognition_models
 # fix_face_recognition_path()
 
 
-from settings_manager import SettingsManager
+from settings_manager import SettingsManager, BASE_DIR
 from modules.actions import trigger_protection
-from modules.vision import VisionMonitor
-from modules.audio import AudioMonitor, measure_ambient_noise
-
-
-# --- 资源路径查找 ---
-def get_resource_path(relative_path):
-    """
-    智能查找资源路径
-    """
-    # 1. 本地开发环境 (IDE运行)
-    if not getattr(sys, 'frozen', False):
-        # 在 IDE 中，使用当前脚本 (__file__) 所在的目录作为基准
-        base_path = os.path.dirname(os.path.abspath(__file__))
-        return os.path.join(base_path, relative_path)
-
-    # 2. 打包发布环境 (EXE运行)
-    base_dir = os.path.dirname(sys.executable) # exe 所在目录
+from modules.detectors import DETECTOR_CHOICES
+from modules.monitor import MonitorThread, get_resource_path, get_template_dir
+from modules.audio import measure_ambient_noise, record_keyword_sample, parse_keywords
+from modules.kws_templates import KeywordTemplates
+from modules.model_registry import terminate_pyaudio
+from modules.lazy import lazy_import, start_warm_up
+from modules.profiler import toggle_profiler
 
-    # 路径A: 在 exe 同级目录下找
-    path_root = os.path.join(base_dir, relative_path)
-    if os.path.exists(path_root):
-        return path_root
-
-    # 路径B: 在 _internal 目录下找
-    path_internal = os.path.join(base_dir, '_internal', relative_path)
-    if os.path.exists(path_internal):
-        return path_internal
-
-    # 如果都找不到，默认返回 exe 同级目录
-    return path_root
+# 重量级依赖延迟导入：界面先显示，摄像头预览等功能首次使用时 (或后台预热时) 才加载
+cv2 = lazy_import("cv2")
+Image = lazy_import("PIL.Image")
+ImageTk = lazy_import("PIL.ImageTk")
 
 
 class CameraSelectionDialog:
@@ -254,158 +237,6 @@ class CameraSelectionDialog:
         self.top.destroy()
 
 
-class MonitorThread(threading.Thread):
-    def __init__(self, settings, callback_trigger, callback_log, callback_finished):
-        super().__init__()
-        self.settings = settings
-        self.callback_trigger = callback_trigger
-        self.callback_log = callback_log
-        self.callback_finished = callback_finished
-        self.running = True
-        self.paused = False
-
-        self.stranger_counter = 0
-        self.absence_counter = 0
-
-    def run(self):
-        try:
-            self.callback_log("正在初始化 AI 引擎...")
-
-            # --- 1. 初始化视觉 ---
-            vision_mon = None
-            try:
-                cam_idx = int(self.settings.get('camera_index', 0))
-                # 图片路径处理：优先检查绝对路径，其次检查资源路径
-                raw_img_path = self.settings.get('user_image_path', "")
-
-                # 找到用户设置的真实文件
-                if raw_img_path:
-                    if not os.path.exists(raw_img_path):
-                        res_path = get_resource_path(raw_img_path)
-                        if os.path.exists(res_path):
-                            raw_img_path = res_path
-
-                p_scale = float(self.settings.get('process_scale', 0.5))
-
-                vision_mon = VisionMonitor(
-                    user_image_path=raw_img_path,
-                    tolerance=float(self.settings.get('tolerance', 0.6)),
-                    camera_index=cam_idx,
-                    process_scale=p_scale
-                )
-            except Exception as e:
-                self.callback_log(f"视觉模块初始化异常: {e}")
-                return
-
-                # --- 2. 初始化音频 ---
-            audio_mon = None
-            try:
-                model_path = get_resource_path("model")
-
-                # 仅在打包环境 (frozen) 下尝试 Fallback 查找
-                # 只有在打包成 exe 后，才有可能出现 _internal 这种结构
-                if getattr(sys, 'frozen', False):
-                    if not os.path.exists(model_path):
-                        base = os.path.dirname(sys.executable)
-                        fallback = os.path.join(base, '_internal', 'model')
-                        if os.path.exists(fallback):
-                            model_path = fallback
-
-                self.callback_log(f"加载语音模型: {model_path}")
-
-                audio_mon = AudioMonitor(
-                    keywords_str=self.settings.get('voice_keywords', ""),
-                    model_path=model_path,
-                    energy_threshold=int(self.settings.get('voice_energy_threshold', 300))
-                )
-            except Exception as e:
-                self.callback_log(f"音频模块警告: {e}")
-                self.callback_log("--> 提示: 请确认 'model' 文件夹存在于软件目录中。")
-
-            # --- 3. 状态自检与启动 ---
-            # 视觉状态检查
-            vision_active = False
-            if vision_mon.is_ready:
-                self.callback_log(f"✔ 视觉监控就绪 (画质: {p_scale})")
-                vision_active = True
-            else:
-                self.callback_log("❌ 视觉警告：未设置用户照片！")
-                self.callback_log("--> 摄像头将【不会启动】。请先在'视觉识别'页浏览并选择您的照片。")
-
-            # 音频状态检查
-            audio_active = False
-            if audio_mon:
-                self.callback_log("✔ 语音监控：已就绪")
-                audio_active = True
-
-            if not vision_active and not audio_active:
-                self.callback_log("⚠️ 警告：视觉和语音均未就绪，监控实际上在空转。")
-
-            self.callback_log(">>> 监控循环已开始 <<<")
-
-            while self.running:
-                if self.paused:
-                    time.sleep(1)
-                    continue
-
-                # --- 视觉检测 (仅当准备好时才执行) ---
-                if vision_active and vision_mon:
-                    # get_status 内部会尝试打开摄像头
-                    status = vision_mon.get_status()
-
-                    if status == 'stranger':
-                        self.stranger_counter += 1
-                        limit = int(self.settings.get('stranger_threshold', 3))
-                        self.callback_log(f"检测到陌生人 ({self.stranger_counter}/{limit})")
-                        if self.stranger_counter >= limit:
-                            self.trigger("陌生人靠近")
-
-                    elif status == 'absence':
-                        self.absence_counter += 1
-                        limit = int(self.settings.get('absence_threshold', 5))
-                        self.callback_log(f"检测到离席 ({self.absence_counter}/{limit})")
-                        if self.absence_counter >= limit:
-                            self.trigger("用户离席")
-
-                    elif status == 'safe':
-                        self.stranger_counter = 0
-                        self.absence_counter = 0
-
-                # --- 音频检测 ---
-                if audio_active and audio_mon and audio_mon.check_trigger():
-                    self.trigger("语音关键词匹配")
-
-                time.sleep(float(self.settings.get('sample_interval', 0.5)))
-
-            # 清理
-            if vision_mon: vision_mon.stop_camera()
-            if audio_mon: audio_mon.stop()
-            self.callback_log("监控已停止。")
-
-        except Exception as e:
-            self.callback_log(f"致命错误: {e}")
-        finally:
-            self.callback_finished()
-
-    def trigger(self, reason):
-        self.callback_log(f"!!! 触发保护: {reason} !!!")
-        self.paused = True
-        self.callback_trigger()
-
-        # 使用配置的冷却时间
-        cool_time = int(self.settings.get('cooling_time', 10))
-        self.callback_log(f"进入冷却模式 ({cool_time}s)...")
-        time.sleep(cool_time)
-
-        self.stranger_counter = 0
-        self.absence_counter = 0
-        self.paused = False
-        self.callback_log("恢复监控。")
-
-    def stop(self):
-        self.running = False
-
-
 class MainWindow:
     def __init__(self, root):
         self.root = root
@@ -435,6 +266,9 @@ class MainWindow:
         self.btn_toggle.pack(side='left', fill='x', expand=True, padx=5)
         self.lbl_status = ttk.Label(top_frame, text="状态: 待机", foreground="gray")
         self.lbl_status.pack(side='right', padx=10)
+        # 性能采样：排查 CPU 占用高的问题，结果保存在软件目录 (快捷键 Ctrl+Shift+P)
+        ttk.Button(top_frame, text="性能采样", command=self.toggle_profiling).pack(side='right', padx=5)
+        self.root.bind_all("<Control-Shift-P>", lambda e: self.toggle_profiling())
 
         notebook = ttk.Notebook(self.root)
         notebook.pack(fill='both', expand=True, padx=10, pady=5)
@@ -491,8 +325,8 @@ class MainWindow:
         notebook.add(tab_vision, text="视觉识别")
 
         # 文件选择器加过滤器
-        self._build_file_picker(tab_vision, "我的照片:", "user_image_path", 0, "用于核验本人 (必须设置！)",
-                                file_filter="image")
+        self._build_file_picker(tab_vision, "我的照片:", "user_image_path", 0,
+                                "用于核验本人 (必须设置！可选择文件夹登记多张照片)", file_filter="image")
 
         ttk.Label(tab_vision, text="摄像头设备:").grid(row=3, column=0, sticky='nw', pady=(10, 0))
         cam_frame = ttk.Frame(tab_vision)
@@ -505,14 +339,30 @@ class MainWindow:
         self._build_slider(tab_vision, "检测画质(缩放):", "process_scale", 4, 0.25, 1.0,
                            "越高越清晰但CPU占用越高，默认0.5", is_int=False)
 
+        self.var_auto_scale = tk.BooleanVar(value=bool(self.settings.get('auto_scale', False)))
+        ttk.Checkbutton(tab_vision, text="自动画质", variable=self.var_auto_scale).grid(row=12, column=3, sticky='w',
+                                                                                    pady=(10, 0))
+        self._build_slider(tab_vision, "目标单帧耗时(ms):", "target_latency_ms", 9, 30, 500,
+                           "勾选自动画质后，根据此耗时自动调整画质 (上面的画质作为初始值)", is_int=True)
+
         self._build_slider(tab_vision, "人脸容差:", "tolerance", 5, 0.3, 0.8, "越低越严格，默认0.6", is_int=False)
         self._build_slider(tab_vision, "陌生人触发阈值:", "stranger_threshold", 6, 1, 10, "连续检测帧数，默认1", is_int=True)
         self._build_slider(tab_vision, "离席触发阈值:", "absence_threshold", 7, 1, 20, "连续检测帧数，默认10", is_int=True)
 
+        ttk.Label(tab_vision, text="人脸检测器:").grid(row=24, column=0, sticky='nw', pady=(10, 0))
+        self.var_face_detector = tk.StringVar(value=self.settings.get('face_detector', 'hog'))
+        ttk.Combobox(tab_vision, textvariable=self.var_face_detector, values=DETECTOR_CHOICES,
+                     state="readonly", width=10).grid(row=24, column=1, sticky='w', pady=(10, 0))
+        ttk.Label(tab_vision, text="hog: 准确; haar: 最快; yunet: 需模型文件; cascade: haar 过滤 + hog 确认",
+                  foreground="#666").grid(row=25, column=1, sticky='w')
+
         # Tab 3
         tab_audio = ttk.Frame(notebook, padding=10)
         notebook.add(tab_audio, text="语音监听")
         self._build_entry(tab_audio, "触发关键词:", "voice_keywords", 0, "英文逗号分隔，如: 老板,来了")
+        self.var_voice_grammar_mode = tk.BooleanVar(value=bool(self.settings.get('voice_grammar_mode', False)))
+        ttk.Checkbutton(tab_audio, text="关键词模式 (只识别关键词，更省 CPU)",
+                        variable=self.var_voice_grammar_mode).grid(row=0, column=2, sticky='w', pady=(10, 0))
 
         # 噪音检测 UI
         ttk.Label(tab_audio, text="环境噪音门限:").grid(row=2, column=0, sticky='nw', pady=(10, 0))
@@ -535,7 +385,37 @@ class MainWindow:
                                                                                                           column=1,
                                                                                                           sticky='w')
 
-        ttk.Label(tab_audio, text="提示: 模型需位于 exe 同级或 _internal 文件夹中。", foreground="gray").grid(row=4,
+        self.var_voice_adaptive_threshold = tk.BooleanVar(
+            value=bool(self.settings.get('voice_adaptive_threshold', True)))
+        ttk.Checkbutton(tab_audio, text="自动跟踪环境噪音 (上方门限作为初始值)",
+                        variable=self.var_voice_adaptive_threshold).grid(row=2, column=2, sticky='nw', pady=(10, 0))
+        # 监控运行中实时显示 音量 / 噪声底 / 门限
+        self.lbl_noise_live = ttk.Label(tab_audio, text="实时噪音: 未运行", foreground="#666")
+        self.lbl_noise_live.grid(row=3, column=2, sticky='w')
+
+        # 两级检测：关键词录音样本
+        ttk.Label(tab_audio, text="关键词样本:").grid(row=5, column=0, sticky='nw', pady=(10, 0))
+        sample_frame = ttk.Frame(tab_audio)
+        sample_frame.grid(row=5, column=1, columnspan=2, sticky='w', pady=(10, 0))
+        self.var_sample_keyword = tk.StringVar()
+        self.cb_sample_keyword = ttk.Combobox(sample_frame, textvariable=self.var_sample_keyword, width=10,
+                                              state='readonly', postcommand=self._refresh_sample_keywords)
+        self.cb_sample_keyword.pack(side='left', padx=5)
+        self.cb_sample_keyword.bind("<<ComboboxSelected>>", lambda e: self._update_sample_count())
+        self.btn_record_sample = ttk.Button(sample_frame, text="录制样本(2s)", command=self.record_sample)
+        self.btn_record_sample.pack(side='left', padx=5)
+        ttk.Button(sample_frame, text="清空样本", command=self.clear_samples).pack(side='left', padx=5)
+        self.lbl_sample_count = ttk.Label(sample_frame, text="")
+        self.lbl_sample_count.pack(side='left', padx=5)
+        self._refresh_sample_keywords()
+
+        self.var_voice_template_stage = tk.BooleanVar(value=bool(self.settings.get('voice_template_stage', False)))
+        ttk.Checkbutton(tab_audio, text="两级检测 (先用录音样本初筛，命中后再交给识别器，更省 CPU)",
+                        variable=self.var_voice_template_stage).grid(row=6, column=1, columnspan=2, sticky='w')
+        ttk.Label(tab_audio, text="每个关键词建议录 3 个以上样本；有关键词缺少样本时自动退回完整识别。",
+                  foreground="gray").grid(row=7, column=1, columnspan=2, sticky='w')
+
+        ttk.Label(tab_audio, text="提示: 模型需位于 exe 同级或 _internal 文件夹中。", foreground="gray").grid(row=8,
                                                                                                              column=1,
                                                                                                              sticky='w',
                                                                                                              pady=10)
@@ -551,7 +431,10 @@ class MainWindow:
     def detect_noise(self):
         # 如果正在监控，禁止检测
         if self.monitor_thread and self.monitor_thread.is_alive():
-            messagebox.showwarning("提示", "请先停止监控，再进行噪音检测。")
+            if self.var_voice_adaptive_threshold.get():
+                messagebox.showinfo("提示", "监控运行中已在自动跟踪环境噪音，无需手动检测。")
+            else:
+                messagebox.showwarning("提示", "请先停止监控，再进行噪音检测。")
             return
 
         def _detect_task():
@@ -579,6 +462,51 @@ class MainWindow:
         self.save_all()
 
 
+    # ==================  关键词样本录制 ==================
+    def _refresh_sample_keywords(self):
+        keywords = parse_keywords(self.ent_voice_keywords.get())
+        self.cb_sample_keyword.config(values=keywords)
+        if self.var_sample_keyword.get() not in keywords:
+            self.var_sample_keyword.set(keywords[0] if keywords else "")
+        self._update_sample_count()
+
+    def _update_sample_count(self):
+        keyword = self.var_sample_keyword.get()
+        count = KeywordTemplates(get_template_dir(self.settings)).count(keyword) if keyword else 0
+        self.lbl_sample_count.config(text=f"已录 {count} 个")
+
+    def record_sample(self):
+        keyword = self.var_sample_keyword.get()
+        if not keyword:
+            messagebox.showwarning("提示", "请先填写触发关键词。")
+            return
+        if self.monitor_thread and self.monitor_thread.is_alive():
+            messagebox.showwarning("提示", "请先停止监控，再录制样本。")
+            return
+
+        def _record_task():
+            self.root.after(0, lambda: self.btn_record_sample.config(state='disabled', text="请说出关键词..."))
+            try:
+                pcm = record_keyword_sample(duration=2.0)
+                if pcm:
+                    KeywordTemplates(get_template_dir(self.settings)).save_sample(keyword, pcm)
+                    msg = f"已保存关键词样本: {keyword} ({len(pcm) / 32000:.2f}s)"
+                else:
+                    msg = "没有录到声音，请靠近麦克风重试。"
+            except Exception as e:
+                msg = f"录制失败: {e}"
+            self.root.after(0, lambda: self.log(msg))
+            self.root.after(0, self._update_sample_count)
+            self.root.after(0, lambda: self.btn_record_sample.config(state='normal', text="录制样本(2s)"))
+
+        threading.Thread(target=_record_task, daemon=True).start()
+
+    def clear_samples(self):
+        keyword = self.var_sample_keyword.get()
+        if keyword and messagebox.askyesno("确认", f"删除关键词 \"{keyword}\" 的全部录音样本？"):
+            KeywordTemplates(get_template_dir(self.settings)).clear(keyword)
+            self._update_sample_count()
+
     # --- 白名单管理函数 ---
     def add_whitelist_app(self):
         # 允许选择多个 exe
@@ -633,6 +561,16 @@ class MainWindow:
                 entry.insert(0, path)
 
         ttk.Button(parent, text="浏览...", command=browse).grid(row=row * 3, column=2, padx=5, pady=(10, 0))
+
+        # 照片还可以选择整个文件夹 (多张照片)
+        if file_filter == "image":
+            def browse_dir():
+                path = filedialog.askdirectory(title="选择照片文件夹")
+                if path:
+                    entry.delete(0, tk.END)
+                    entry.insert(0, path)
+
+            ttk.Button(parent, text="文件夹...", command=browse_dir).grid(row=row * 3, column=3, pady=(10, 0))
         ttk.Label(parent, text=tooltip, foreground="#666").grid(row=row * 3 + 1, column=1, sticky='w')
         setattr(self, f"ent_{key}", entry)
 
@@ -679,19 +617,45 @@ class MainWindow:
             "whitelist_apps": whitelist,
             "user_image_path": self.ent_user_image_path.get(),
             "voice_keywords": self.ent_voice_keywords.get(),
+            "voice_grammar_mode": self.var_voice_grammar_mode.get(),
+            "voice_template_stage": self.var_voice_template_stage.get(),
             "camera_index": self.var_camera_index.get(),
             "process_scale": round(self.var_process_scale.get(), 2),
+            "auto_scale": self.var_auto_scale.get(),
+            "target_latency_ms": int(self.var_target_latency_ms.get()),
             "tolerance": round(self.var_tolerance.get(), 2),
             "stranger_threshold": int(self.var_stranger_threshold.get()),
             "absence_threshold": int(self.var_absence_threshold.get()),
+            "face_detector": self.var_face_detector.get(),
 
             "voice_energy_threshold": self.var_noise_val.get(),
+            "voice_adaptive_threshold": self.var_voice_adaptive_threshold.get(),
             "cooling_time": int(self.var_cooling_time.get())
         }
+        old_keywords = self.settings.get('voice_keywords', "")
         if self.manager.save_settings(new_conf):
-            self.settings = new_conf
+            # 使用合并后的完整配置，保留界面上没有的字段
+            self.settings = self.manager.settings
+            self._apply_keywords_to_running(old_keywords)
             messagebox.showinfo("成功", "配置已保存")
 
+    def _apply_keywords_to_running(self, old_keywords):
+        """监控运行中修改了关键词：直接更新语音监听 (无需重启监控，模型不重新加载)"""
+        keywords = self.settings.get('voice_keywords', "")
+        thread = self.monitor_thread
+        audio_mon = thread.audio_mon if thread and thread.is_alive() else None
+        if audio_mon is None or keywords == old_keywords:
+            return
+        self.log(f"关键词已修改，正在更新语音监听: {keywords}")
+        # 关键词模式下需要重建识别器、两级检测需要重新加载样本，放到后台线程，不卡界面
+        def _update_task():
+            try:
+                audio_mon.set_keywords(keywords)
+            except Exception as e:
+                self.handle_log_from_thread(f"更新关键词失败: {e}，请重启监控")
+
+        threading.Thread(target=_update_task, daemon=True).start()
+
     def toggle_monitoring(self):
         if self.monitor_thread and self.monitor_thread.is_alive():
             self.monitor_thread.stop()
@@ -707,6 +671,28 @@ class MainWindow:
             self.monitor_thread.start()
             self.btn_toggle.config(text="停止监控")
             self.lbl_status.config(text="状态: 运行中", foreground="green")
+            self._refresh_noise_level()
+
+    def _refresh_noise_level(self):
+        """监控运行期间每秒刷新一次实时噪音显示"""
+        thread = self.monitor_thread
+        if not (thread and thread.is_alive()):
+            self.lbl_noise_live.config(text="实时噪音: 未运行")
+            return
+        audio_mon = thread.audio_mon
+        if audio_mon:
+            level = audio_mon.get_noise_level()
+            floor = level['noise_floor'] if level['noise_floor'] is not None else "-"
+            self.lbl_noise_live.config(
+                text=f"实时噪音: 音量 {level['rms']} / 噪声底 {floor} / 门限 {level['threshold']}")
+        self.root.after(1000, self._refresh_noise_level)
+
+    def toggle_profiling(self):
+        """开始一次性能采样；正在采样时提前结束并写出结果"""
+        toggle_profiler(BASE_DIR,
+                        duration=float(self.settings.get('profiler_seconds', 30)),
+                        interval_ms=int(self.settings.get('profiler_interval_ms', 10)),
+                        callback_log=self.handle_log_from_thread)
 
     def on_thread_finished(self):
         self.root.after(0, self._reset_ui_state)
@@ -718,17 +704,32 @@ class MainWindow:
     def handle_log_from_thread(self, msg):
         self.root.after(0, lambda: self.log(msg))
 
-    def execute_protection(self):
-        self.root.after(0, lambda: trigger_protection(
-            self.settings.get('action_type', 'minimize'),
-            self.settings.get('safe_app_path'),
-            self.settings.get('fallback_url'),
-            # 传递白名单参数
-            self.settings.get('whitelist_apps', [])
-        ))
+    def execute_protection(self, event=None):
+        def _protect():
+            trigger_protection(
+                self.settings.get('action_type', 'minimize'),
+                self.settings.get('safe_app_path'),
+                self.settings.get('fallback_url'),
+                # 传递白名单参数
+                self.settings.get('whitelist_apps', [])
+            )
+            if event is not None:
+                # 从检测到 (如说出关键词被识别) 到保护动作执行完毕的总耗时
+                latency = (time.monotonic() - event.timestamp) * 1000
+                self.log(f"保护已执行 [{event.source}]，检测 → 保护耗时 {latency:.0f} ms")
+
+        self.root.after(0, _protect)
 
 
 if __name__ == "__main__":
     root = tk.Tk()
     app = MainWindow(root)
-    root.mainloop()
\ No newline at end of file
+
+    def _on_window_shown():
+        app.log(f"[启动] 界面显示耗时 {(time.perf_counter() - STARTUP_TIME) * 1000:.0f} ms，正在后台预加载识别引擎...")
+        start_warm_up(callback_log=app.handle_log_from_thread)
+
+    # 窗口绘制完成后再开始预热，界面可以立即操作
+    root.after(100, _on_window_shown)
+    root.mainloop()
+    terminate_pyaudio()
\ No newline at end of file
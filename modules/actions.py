@@ -2,8 +2,12 @@ import os
 import webbrowser
 import platform
 import ctypes
-import pyautogui
 import subprocess
+from modules.lazy import lazy_import
+from modules.metrics import METRICS
+
+# pyautogui 会连带导入 PIL 等，首次执行保护动作时才加载
+pyautogui = lazy_import("pyautogui")
 
 # Windows 音量控制常量
 VK_VOLUME_MUTE = 0xAD
@@ -114,11 +118,24 @@ def trigger_protection(action_type, safe_app_path, fallback_url, whitelist_apps=
     3. 打开伪装应用
     """
     print(f"正在触发保护! 动作: {action_type}")
+    METRICS.inc("actions_triggered")
+
+    with METRICS.timer("actions_total"):
+        # 1. 优先静音
+        with METRICS.timer("actions_mute"):
+            set_system_mute()
+
+        # 2. 处理当前窗口
+        with METRICS.timer("actions_window"):
+            _handle_windows(action_type, whitelist_apps)
 
-    # 1. 优先静音
-    set_system_mute()
+        # 3. 打开安全应用
+        with METRICS.timer("actions_open_app"):
+            _open_safe_app(safe_app_path, fallback_url)
 
-    # 2. 处理当前窗口
+
+def _handle_windows(action_type, whitelist_apps):
+    """最小化 / 关闭当前窗口"""
     if action_type == 'minimize':
         # Win+D 显示桌面 (最小化所有)
         pyautogui.hotkey('win', 'd')
@@ -129,7 +146,9 @@ def trigger_protection(action_type, safe_app_path, fallback_url, whitelist_apps=
         # 传入白名单
         close_all_user_windows(whitelist_apps)
 
-    # 3. 打开安全应用
+
+def _open_safe_app(safe_app_path, fallback_url):
+    """全屏打开伪装应用，未配置或打开失败时打开备用链接"""
     app_opened = False
     if safe_app_path and os.path.exists(safe_app_path):
         try:
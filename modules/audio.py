@@ -1,10 +1,17 @@
 import os
 import time
-import audioop
 import json
+import queue
 import threading
-import pyaudio
-from vosk import Model, KaldiRecognizer
+from modules.vad import VoiceActivityDetector, NoiseFloorTracker, rms
+from modules.keywords import KeywordMatcher
+from modules.kws_templates import KeywordTemplates, TemplateSpotter, trim_silence
+from modules.model_registry import acquire_model, release_model, get_pyaudio
+from modules.audio_source import MicrophoneSource, SAMPLE_RATE
+from modules.lazy import lazy_import
+from modules.metrics import METRICS
+
+vosk = lazy_import("vosk")
 
 
 def measure_ambient_noise(duration=5):
@@ -12,7 +19,10 @@ def measure_ambient_noise(duration=5):
     静态辅助函数：采集环境噪音 5秒，返回推荐的阈值 (平均能量 * 1.2)
     注意：调用此函数前应确保麦克风未被其他线程占用
     """
-    p = pyaudio.PyAudio()
+    import pyaudio
+
+    p = get_pyaudio()
+    stream = None
     try:
         stream = p.open(format=pyaudio.paInt16, channels=1, rate=16000, input=True, frames_per_buffer=4000)
         print(f"开始采集环境噪音 ({duration}秒)...")
@@ -23,11 +33,7 @@ def measure_ambient_noise(duration=5):
         while time.time() - start_time < duration:
             data = stream.read(4000, exception_on_overflow=False)
             # 计算这一帧的均方根 (RMS) 能量
-            rms = audioop.rms(data, 2)  # 2 表示采样宽度 (16bit = 2bytes)
-            rms_values.append(rms)
-
-        stream.stop_stream()
-        stream.close()
+            rms_values.append(rms(data))
 
         if not rms_values:
             return 300  # 默认值
@@ -44,27 +50,97 @@ def measure_ambient_noise(duration=5):
         print(f"噪音检测失败: {e}")
         return 300
     finally:
-        p.terminate()
+        # PyAudio 实例为全局共享，只关闭本次打开的流
+        if stream is not None:
+            stream.stop_stream()
+            stream.close()
+
+
+def record_keyword_sample(duration=2.0):
+    """
+    录制一段关键词样本 (用于两级检测的初筛模板)，返回裁掉首尾静音后的 16bit PCM
+    注意：与噪音检测一样，调用前应确保麦克风未被其他线程占用
+    """
+    import pyaudio
+
+    p = get_pyaudio()
+    stream = None
+    try:
+        stream = p.open(format=pyaudio.paInt16, channels=1, rate=SAMPLE_RATE, input=True, frames_per_buffer=1600)
+        chunks = []
+        for _ in range(int(duration * SAMPLE_RATE / 1600)):
+            chunks.append(stream.read(1600, exception_on_overflow=False))
+        return trim_silence(b"".join(chunks))
+    finally:
+        if stream is not None:
+            stream.stop_stream()
+            stream.close()
+
+
+def parse_keywords(keywords_str):
+    """将英文逗号分隔的关键词字符串拆分为列表"""
+    return [k.strip().lower() for k in keywords_str.split(',') if k.strip()]
 
 
 class AudioMonitor:
-    def __init__(self, keywords_str, model_path="model", energy_threshold=None):
+    def __init__(self, keywords_str, model_path="model", energy_threshold=None, grammar_mode=False,
+                 vad_hangover_ms=400, vad_preroll_ms=300, chunk_ms=100, queue_seconds=2.0,
+                 audio_source=None, on_detect=None, adaptive_threshold=False, noise_floor_ratio=2.5,
+                 template_dir=None, template_threshold_scale=1.3, confirm_ms=1500):
         """
         初始化音频监控 (本地离线版)
         :param keywords_str: 英文逗号分隔的关键词字符串
         :param model_path: 本地模型路径
+        :param grammar_mode: 关键词模式，识别器只在 关键词 + [unk] 中搜索，比开放词表省 CPU 且误触更少
+                             (关键词需是模型词表中的词，否则会被 Vosk 忽略)
+        :param vad_hangover_ms: 语音结束后继续送入识别器的时长 (毫秒)
+        :param vad_preroll_ms: 语音起点前一并送入识别器的预录时长 (毫秒)
+        :param chunk_ms: 每个音频块的时长 (毫秒)，越小关键词触发越及时
+        :param queue_seconds: 采集与识别之间的缓冲队列最多容纳的音频时长 (秒)，识别卡顿时超出部分丢弃最旧的数据
+        :param audio_source: 音频来源，默认麦克风；可传入 WavFileSource 离线回放
+        :param on_detect: 检测到关键词时的回调 on_detect(关键词, 音频流中的位置秒数, 置信度 0-1)，在识别线程中调用
+                          置信度来自初筛的模板距离；未启用两级检测时识别器不提供分数，固定为 1.0
+        :param adaptive_threshold: 持续跟踪背景噪声并自动调整门限 (energy_threshold 作为初始值)
+        :param noise_floor_ratio: 自动门限相对噪声底的倍数
+        :param template_dir: 关键词录音样本目录；提供时启用两级检测：先用样本做 MFCC + DTW 初筛，
+                             命中候选后才把音频交给识别器确认 (每个关键词都需要有样本，否则不启用)
+        :param template_threshold_scale: 初筛门限倍数，越大越容易进入确认
+        :param confirm_ms: 候选命中后继续送入识别器确认的时长 (毫秒)
         """
         # 处理关键词
-        self.keywords = [k.strip().lower() for k in keywords_str.split(',') if k.strip()]
+        self.keywords = parse_keywords(keywords_str)
+        self.matcher = KeywordMatcher(self.keywords)
+        self.grammar_mode = grammar_mode
 
         self.energy_threshold = int(energy_threshold)
-        print(f"[Audio] 当前噪音过滤门限: {self.energy_threshold}")
+        print(f"[Audio] 当前噪音过滤门限: {self.energy_threshold}" + (" (自动跟踪环境噪音)" if adaptive_threshold else ""))
+
+        # 语音活动检测：静音整段跳过，语音起点带上预录音频
+        self.noise_tracker = NoiseFloorTracker(ratio=noise_floor_ratio) if adaptive_threshold else None
+        self.vad = VoiceActivityDetector(self.energy_threshold, hangover_ms=vad_hangover_ms,
+                                         preroll_ms=vad_preroll_ms, noise_tracker=self.noise_tracker)
+
+        # 采集 (音频来源) -> 有界队列 -> 识别线程
+        self.source = audio_source or MicrophoneSource()
+        self.on_detect = on_detect
+        # 块长至少 10ms；队列长度按实际块长换算
+        self.chunk_samples = max(160, int(SAMPLE_RATE * chunk_ms / 1000))
+        # 识别线程已处理的音频总采样数 (用于计算关键词在音频流中的位置)
+        self.samples_consumed = 0
+        self.audio_queue = queue.Queue(maxsize=max(1, int(queue_seconds * SAMPLE_RATE / self.chunk_samples)))
+        # 实际送入识别器的采样数 (两级检测下远小于 samples_consumed)
+        self.decoded_samples = 0
+        # 统计：丢弃的音频块、驱动报告的溢出次数、队列最大深度
+        self.dropped_chunks = 0
+        self.overflow_count = 0
+        self.max_queue_depth = 0
 
         # 线程控制
         self.running = False
         self.thread = None
         self.lock = threading.Lock()
-        self.triggered_keyword = None
+        # set_keywords 准备好的 (关键词, 识别器, 匹配器, 初筛器)，由识别线程在两个音频块之间替换
+        self._pending_keywords = None
 
         print(f"[Audio] 正在初始化，模型路径: {model_path}")
         # 检查模型路径
@@ -88,11 +164,10 @@ class AudioMonitor:
             print("[Audio Warning] 警告：未检测到 final.mdl 文件，模型加载可能会失败。")
 
 
-        # 1. 初始化 Vosk 模型
-        print(f"正在加载本地语音模型: {model_path} ...")
+        # 1. 初始化 Vosk 模型 (进程内只加载一次，重启监控时直接复用)
+        self.model_path = model_path
         try:
-            # Vosk 会自动在 model_path 下寻找 final.mdl 等文件
-            self.model = Model(model_path)
+            self.model = acquire_model(model_path)
             print("[Audio] Vosk 模型加载成功！")
         except Exception as e:
             print(f"[Audio Critical] 模型加载崩溃。原因可能是文件结构被破坏。")
@@ -100,18 +175,90 @@ class AudioMonitor:
             print("提示: 请确保 'model' 文件夹内直接包含 'conf', 'graph', 'am' 和 'ivector' 等文件夹")
             raise e
 
-        # 2. 初始化识别器
-        # 16000 是采样率，Vosk 模型需要 16k
-        self.recognizer = KaldiRecognizer(self.model, 16000)
-
-        # 3. 初始化 PyAudio
-        self.p = pyaudio.PyAudio()
-        self.stream = None
-
-        print(f"音频引擎初始化完毕。监听关键词: {self.keywords}")
+        try:
+            # 2. 初始化识别器
+            self.recognizer = self._build_recognizer(self.keywords)
+
+            # 3. 两级检测的初筛 (可选)
+            self.templates = KeywordTemplates(template_dir) if template_dir else None
+            self.template_threshold_scale = template_threshold_scale
+            self.confirm_samples = int(SAMPLE_RATE * confirm_ms / 1000)
+            self._confirm_left = 0
+            # 当前确认窗口对应的初筛距离
+            self._candidate_distance = None
+            # 识别器中是否有尚未结束的一句话 (送入过音频、还没有取出最终结果)
+            self._utterance_open = False
+            self.spotter = self._build_spotter(self.keywords)
+
+            print(f"音频引擎初始化完毕。监听关键词: {self.keywords}")
+
+            # 启动监听线程
+            self.start_listening()
+        except Exception:
+            # 构造失败时调用方拿不到实例，也就无法调用 stop()，在这里归还模型引用
+            release_model(self.model_path)
+            self.model = None
+            raise
+
+    def _build_recognizer(self, keywords):
+        """
+        创建识别器
+        16000 是采样率，Vosk 模型需要 16k
+        关键词模式下传入语法列表，[unk] 用于吸收其它所有语音
+        """
+        if self.grammar_mode and keywords:
+            grammar = json.dumps(keywords + ["[unk]"], ensure_ascii=False)
+            print(f"[Audio] 关键词模式，语法: {grammar}")
+            return vosk.KaldiRecognizer(self.model, 16000, grammar)
+        return vosk.KaldiRecognizer(self.model, 16000)
+
+    def _build_spotter(self, keywords):
+        """加载关键词样本，构建初筛器；有关键词缺少样本时返回 None (全部交给识别器)"""
+        if self.templates is None or not keywords:
+            return None
+        spotter = TemplateSpotter(self.templates, keywords,
+                                  mfcc_conf=os.path.join(self.model_path, 'conf', 'mfcc.conf'),
+                                  threshold_scale=self.template_threshold_scale)
+        if spotter.missing:
+            print(f"[Audio] 以下关键词没有录音样本，两级检测未启用: {spotter.missing}")
+            return None
+        thresholds = ", ".join(f"{kw}={t:.3f}" for kw, t in spotter.thresholds.items())
+        print(f"[Audio] 两级检测已启用，初筛门限: {thresholds}")
+        return spotter
+
+    def set_keywords(self, keywords_str):
+        """
+        运行中修改关键词，关键词模式下会重建识别器 (模型无需重新加载)
+        可在任意线程调用：这里只准备好新的识别器等对象，由识别线程在处理下一个音频块前替换，
+        避免同一块音频的识别结果被新旧对象混用
+        """
+        keywords = parse_keywords(keywords_str)
+        with self.lock:
+            current = self._pending_keywords[0] if self._pending_keywords else self.keywords
+        if keywords == current:
+            return
+        recognizer = self._build_recognizer(keywords) if self.grammar_mode else None
+        matcher = KeywordMatcher(keywords)
+        spotter = self._build_spotter(keywords)
+        with self.lock:
+            self._pending_keywords = (keywords, recognizer, matcher, spotter)
 
-        # 启动监听线程
-        self.start_listening()
+    def _apply_pending_keywords(self):
+        """识别线程调用：替换为 set_keywords 准备好的对象"""
+        with self.lock:
+            pending, self._pending_keywords = self._pending_keywords, None
+        if pending is None:
+            return
+        # 旧识别器中尚未结束的一句话先按旧关键词收尾
+        if self._utterance_open or self._confirm_left > 0:
+            self._finish_utterance()
+        keywords, recognizer, matcher, spotter = pending
+        self.keywords = keywords
+        self.matcher = matcher
+        self.spotter = spotter
+        if recognizer is not None:
+            self.recognizer = recognizer
+        print(f"[Audio] 关键词已更新: {self.keywords}")
 
     def start_listening(self):
         """启动后台监听线程"""
@@ -119,72 +266,207 @@ class AudioMonitor:
             return
 
         self.running = True
-        self.stream = self.p.open(format=pyaudio.paInt16,
-                                  channels=1,
-                                  rate=16000,
-                                  input=True,
-                                  frames_per_buffer=4000)
-        self.stream.start_stream()
-
-        self.thread = threading.Thread(target=self._listen_loop, daemon=True)
+        self.thread = threading.Thread(target=self._listen_loop, daemon=True, name="audio-listen")
         self.thread.start()
+        try:
+            self.source.start(self._push_audio, self.chunk_samples)
+        except Exception:
+            # 打开麦克风失败 (没有输入设备、PortAudio 出错等)：结束刚启动的监听线程，不留下空转线程
+            self.running = False
+            self.thread.join(timeout=1.0)
+            self.thread = None
+            raise
+
+    def _push_audio(self, data, overflow=False, block=False):
+        """
+        音频来源调用：把一块音频放入队列
+        :param overflow: 驱动是否报告了溢出
+        :param block: 队列满时是否等待 (离线回放)；否则丢弃最旧的一块 (实时采集)
+        """
+        if overflow:
+            self.overflow_count += 1
+
+        if block:
+            while self.running:
+                try:
+                    self.audio_queue.put(data, timeout=0.5)
+                    break
+                except queue.Full:
+                    continue
+        else:
+            self._put_latest(data)
+
+        depth = self.audio_queue.qsize()
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+
+    def _put_latest(self, data):
+        try:
+            self.audio_queue.put_nowait(data)
+        except queue.Full:
+            # 识别跟不上：丢弃最旧的一块，保留最新的音频
+            try:
+                self.audio_queue.get_nowait()
+            except queue.Empty:
+                pass
+            else:
+                self.audio_queue.task_done()
+            self.dropped_chunks += 1
+            try:
+                self.audio_queue.put_nowait(data)
+            except queue.Full:
+                pass
+
+    def get_stats(self):
+        """音频管线统计，供日志和调参使用"""
+        return {
+            "queue_depth": self.audio_queue.qsize(),
+            "max_queue_depth": self.max_queue_depth,
+            "dropped_chunks": self.dropped_chunks,
+            "overflow_count": self.overflow_count,
+            "chunk_ms": self.chunk_samples * 1000 // SAMPLE_RATE,
+            "audio_seconds": self.samples_consumed / SAMPLE_RATE,
+            "decoded_seconds": self.decoded_samples / SAMPLE_RATE,
+            "template_candidates": self.spotter.candidates if self.spotter else None,
+            **self.get_noise_level(),
+        }
+
+    def get_noise_level(self):
+        """
+        当前音量、噪声底与生效中的门限，供界面实时显示
+        噪声底在数据不足或未开启自动跟踪时为 None
+        """
+        return {
+            "rms": int(self.vad.last_rms),
+            "noise_floor": None if self.noise_tracker is None or self.noise_tracker.floor is None
+            else int(self.noise_tracker.floor),
+            "threshold": int(self.vad.energy_threshold),
+        }
 
     def _listen_loop(self):
-        """后台循环：持续读取音频流并识别"""
+        """后台循环：从队列取出音频块并识别"""
         print("语音监听线程已启动...")
+        reported_drops = 0
         while self.running:
             try:
-                # 读取音频数据
-                data = self.stream.read(4000, exception_on_overflow=False)
-                if len(data) == 0:
+                # 取出音频数据 (超时用于及时响应停止)
+                try:
+                    data = self.audio_queue.get(timeout=0.5)
+                except queue.Empty:
                     continue
 
-                # 计算当前音频帧的能量
-                rms = audioop.rms(data, 2)
-                # 如果能量低于阈值，视为静音或背景噪音，直接跳过识别
-                if rms < self.energy_threshold:
-                    continue
+                if self.dropped_chunks != reported_drops:
+                    METRICS.inc("audio_dropped_chunks", self.dropped_chunks - reported_drops)
+                    print(f"[Audio] 识别跟不上采集，累计丢弃 {self.dropped_chunks} 个音频块")
+                    reported_drops = self.dropped_chunks
 
-                # 识别处理
-                if self.recognizer.AcceptWaveform(data):
-                    # 获取完整句子结果
-                    result_json = json.loads(self.recognizer.Result())
-                    text = result_json.get('text', '')
-                else:
-                    # 获取实时部分结果 (Partial) - 反应更快
-                    result_json = json.loads(self.recognizer.PartialResult())
-                    text = result_json.get('partial', '')
-
-                if text:
-                    # 检查是否包含关键词
-                    for kw in self.keywords:
-                        if kw in text:
-                            print(f"【语音触发】检测到关键词: {kw}")
-                            with self.lock:
-                                self.triggered_keyword = kw
-                            # 识别到后重置识别器，防止重复触发
-                            self.recognizer.Reset()
+                METRICS.set_gauge("audio_queue_depth", self.audio_queue.qsize())
+                try:
+                    with METRICS.timer("audio_chunk"):
+                        self.process_chunk(data)
+                finally:
+                    self.audio_queue.task_done()
 
             except Exception as e:
                 print(f"监听循环出错: {e}")
 
-    def check_trigger(self):
+    def process_chunk(self, data):
+        """对一个音频块执行 VAD + 识别 + 关键词匹配"""
+        if len(data) == 0:
+            return
+        if self._pending_keywords is not None:
+            self._apply_pending_keywords()
+        self.samples_consumed += len(data) // 2
+
+        # 语音活动检测：静音或背景噪音直接跳过识别
+        with METRICS.timer("audio_vad"):
+            speech = self.vad.process(data)
+        spotter = self.spotter
+        if speech is None:
+            if not self.vad.in_speech:
+                # 一段语音结束：VAD 只送入很短的拖尾静音，识别器自己很少能判定句尾，
+                # 这里主动取出最终结果，下一句话里的同一关键词才能再次触发
+                if spotter is not None:
+                    spotter.reset()
+                if self._utterance_open:
+                    self._finish_utterance()
+            return
+
+        # 两级检测：初筛未命中的语音不进入识别器
+        if spotter is not None:
+            with METRICS.timer("audio_spotter"):
+                speech = self._first_stage(spotter, speech)
+            if speech is None:
+                return
+
+        # 识别处理
+        self.decoded_samples += len(speech) // 2
+        METRICS.inc("audio_decoded_samples", len(speech) // 2)
+        with METRICS.timer("audio_decode"):
+            final = self.recognizer.AcceptWaveform(speech)
+            # 识别器给出最终结果时自己已开始新的一句
+            self._utterance_open = not final
+            if final:
+                # 获取完整句子结果
+                result_json = json.loads(self.recognizer.Result())
+                text = result_json.get('text', '')
+            else:
+                # 获取实时部分结果 (Partial) - 反应更快
+                result_json = json.loads(self.recognizer.PartialResult())
+                text = result_json.get('partial', '')
+        with METRICS.timer("audio_match"):
+            self._match(text, final)
+
+        if spotter is not None and self._confirm_left <= 0:
+            # 确认窗口结束
+            self._finish_utterance()
+
+    def _first_stage(self, spotter, speech):
         """
-        主程序调用的接口
-        查询自上次检查以来是否有关键词被触发
-        :return: True/False
+        初筛：返回需要送入识别器的音频，不需要时返回 None
+        候选命中时送出搜索窗口内的全部语音 (包含关键词开头)，之后的 confirm_ms 内继续送出
         """
-        with self.lock:
-            if self.triggered_keyword:
-                print(f"主程序获取到触发信号: {self.triggered_keyword}")
-                self.triggered_keyword = None  # 消费掉这个信号
-                return True
-            return False
+        candidate = spotter.feed(speech)
+        if self._confirm_left > 0:
+            self._confirm_left -= len(speech) // 2
+            return speech
+        if candidate is None:
+            return None
+        print(f"[Audio] 初筛命中候选: {candidate} (距离 {spotter.last_distance:.3f})，交给识别器确认")
+        self._confirm_left = self.confirm_samples
+        self._candidate_distance = spotter.last_distance
+        return spotter.recent_audio()
+
+    def _finish_utterance(self):
+        """一句话结束 (语音结束或确认窗口结束)：取出识别器的最终结果，识别器与关键词去重回到初始状态"""
+        self._confirm_left = 0
+        self._utterance_open = False
+        result_json = json.loads(self.recognizer.FinalResult())
+        self._match(result_json.get('text', ''), final=True)
+        self._candidate_distance = None
+
+    def _match(self, text, final):
+        # 增量匹配：只扫描新识别出的字，同一句话内每个关键词只触发一次
+        for kw in self.matcher.feed(text, final=final):
+            print(f"【语音触发】检测到关键词: {kw}")
+            if self.on_detect:
+                confidence = 1.0 if self._candidate_distance is None else max(0.0, 1.0 - self._candidate_distance)
+                self.on_detect(kw, self.samples_consumed / SAMPLE_RATE, confidence)
+
+    def flush(self):
+        """
+        音频流结束时调用 (离线回放)：等待队列处理完毕，并取出识别器中剩余的最终结果
+        """
+        self.audio_queue.join()
+        self._finish_utterance()
 
     def stop(self):
         """停止资源"""
         self.running = False
-        if self.stream:
-            self.stream.stop_stream()
-            self.stream.close()
-        self.p.terminate()
\ No newline at end of file
+        self.source.stop()
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=1.0)
+        # 模型为进程内共享，这里只归还引用
+        if self.model is not None:
+            release_model(self.model_path)
+            self.model = None
\ No newline at end of file
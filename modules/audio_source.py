@@ -0,0 +1,108 @@
+import time
+import wave
+import threading
+import numpy as np
+
+# Vosk 模型需要 16k 单声道 16bit
+SAMPLE_RATE = 16000
+
+
+class MicrophoneSource:
+    """麦克风采集 (PyAudio 回调模式，PortAudio 在自己的线程中采集)"""
+
+    def __init__(self):
+        self.stream = None
+
+    def start(self, sink, chunk_samples):
+        """
+        :param sink: 接收音频块的函数 sink(data, overflow=False, block=False)
+        :param chunk_samples: 每块的采样点数
+        """
+        import pyaudio
+        from modules.model_registry import get_pyaudio
+
+        def callback(in_data, frame_count, time_info, status):
+            # 只负责入队，必须尽快返回
+            sink(in_data, overflow=bool(status & pyaudio.paInputOverflow))
+            return None, pyaudio.paContinue
+
+        self.stream = get_pyaudio().open(format=pyaudio.paInt16,
+                                         channels=1,
+                                         rate=SAMPLE_RATE,
+                                         input=True,
+                                         frames_per_buffer=chunk_samples,
+                                         stream_callback=callback)
+        self.stream.start_stream()
+
+    def stop(self):
+        if self.stream:
+            self.stream.stop_stream()
+            self.stream.close()
+            self.stream = None
+
+
+def read_wav_16k(path):
+    """
+    读取 16bit WAV 并转换为 16kHz 单声道
+    :return: (16bit PCM 字节串, 时长秒数)
+    """
+    with wave.open(path, 'rb') as wf:
+        if wf.getsampwidth() != 2:
+            raise ValueError(f"仅支持 16bit WAV: {path}")
+        channels = wf.getnchannels()
+        rate = wf.getframerate()
+        raw = wf.readframes(wf.getnframes())
+
+    samples = np.frombuffer(raw, dtype=np.int16).astype(np.float32)
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+
+    if rate != SAMPLE_RATE and samples.size:
+        # 线性插值重采样，对语音识别足够
+        duration = samples.size / rate
+        target = np.arange(int(duration * SAMPLE_RATE)) / SAMPLE_RATE
+        samples = np.interp(target, np.arange(samples.size) / rate, samples)
+
+    pcm = np.clip(samples, -32768, 32767).astype(np.int16)
+    return pcm.tobytes(), pcm.size / SAMPLE_RATE
+
+
+class WavFileSource:
+    """
+    WAV 文件回放 (替代麦克风，用于离线测试与性能基准)
+    - realtime=True：按真实时间节奏送出，模拟麦克风
+    - realtime=False：尽快送出，队列满时等待而不是丢弃，用于测量识别速度
+    """
+
+    def __init__(self, path, realtime=False):
+        self.path = path
+        self.realtime = realtime
+        self.data, self.duration = read_wav_16k(path)
+        self.finished = threading.Event()
+        self.running = False
+        self.thread = None
+
+    def start(self, sink, chunk_samples):
+        self.running = True
+        self.thread = threading.Thread(target=self._feed, args=(sink, chunk_samples), daemon=True, name="wav-source")
+        self.thread.start()
+
+    def _feed(self, sink, chunk_samples):
+        chunk_bytes = chunk_samples * 2
+        chunk_seconds = chunk_samples / SAMPLE_RATE
+        deadline = time.monotonic()
+        try:
+            for offset in range(0, len(self.data), chunk_bytes):
+                if not self.running:
+                    break
+                if self.realtime:
+                    deadline += chunk_seconds
+                    time.sleep(max(0.0, deadline - time.monotonic()))
+                sink(self.data[offset:offset + chunk_bytes], block=not self.realtime)
+        finally:
+            self.finished.set()
+
+    def stop(self):
+        self.running = False
+        if self.thread and self.thread.is_alive() and threading.current_thread() is not self.thread:
+            self.thread.join(timeout=1.0)
@@ -0,0 +1,218 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+from modules.lazy import lazy_import
+
+cv2 = lazy_import("cv2")
+
+
+def is_video_file(camera_index):
+    """画面来源是视频文件路径 (而不是摄像头索引)"""
+    return isinstance(camera_index, str)
+
+
+def open_video_capture(camera_index):
+    """
+    打开摄像头 (或视频文件)
+    Windows 下使用 CAP_DSHOW 加速打开，其它平台使用默认后端
+    """
+    if is_video_file(camera_index):
+        return cv2.VideoCapture(camera_index)
+    if os.name == 'nt':
+        return cv2.VideoCapture(camera_index, cv2.CAP_DSHOW)
+    return cv2.VideoCapture(camera_index)
+
+
+class BufferPool:
+    """
+    预分配缓冲区池
+    按 名称 + 形状 复用 numpy 数组，长时间运行时每帧不再分配新的大块内存
+    每个名称最多保留若干种形状 (如检测区域大小变化时)，超出后淘汰最久未用的
+    """
+
+    def __init__(self, max_shapes_per_name=4):
+        self.max_shapes_per_name = max_shapes_per_name
+        self._buffers = {}
+        # 实际分配次数，稳定运行后应不再增长
+        self.allocations = 0
+
+    def get(self, name, shape, dtype=np.uint8):
+        shapes = self._buffers.setdefault(name, OrderedDict())
+        key = (tuple(shape), np.dtype(dtype).str)
+        buf = shapes.get(key)
+        if buf is None:
+            buf = np.empty(shape, dtype=dtype)
+            shapes[key] = buf
+            self.allocations += 1
+            if len(shapes) > self.max_shapes_per_name:
+                shapes.popitem(last=False)
+        else:
+            shapes.move_to_end(key)
+        return buf
+
+
+class FramePreprocessor:
+    """
+    画面预处理 (缩放、颜色转换、运动检测缩略图)
+    所有输出都写入 BufferPool 中的预分配数组，返回的数组在下一次同名调用时会被覆盖
+    """
+
+    def __init__(self):
+        self.pool = BufferPool()
+
+    def motion_thumbnail(self, frame, size):
+        """生成用于运动检测的小尺寸灰度图，size 为 (宽, 高)"""
+        width, height = size
+        small = cv2.resize(frame, size, dst=self.pool.get('thumb', (height, width, 3)),
+                           interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY, dst=self.pool.get('gray', (height, width)))
+
+    def keep_reference(self, thumb):
+        """把当前缩略图复制到参考帧缓冲区 (thumb 本身下一帧会被覆盖)"""
+        ref = self.pool.get('gray_ref', thumb.shape)
+        np.copyto(ref, thumb)
+        return ref
+
+    def motion_diff(self, thumb, ref):
+        """两张灰度缩略图逐像素的差值 (写入复用缓冲区，下次调用时会被覆盖)"""
+        return cv2.absdiff(thumb, ref, dst=self.pool.get('diff', thumb.shape))
+
+    def motion_score(self, thumb, ref):
+        """两张灰度缩略图的平均差值 (0-255)"""
+        return cv2.mean(self.motion_diff(thumb, ref))[0]
+
+    def to_rgb(self, region, scale, name='full'):
+        """
+        按比例缩放并转换为连续内存的 RGB 图 (dlib 无需再拷贝一次)
+        :param name: 缓冲区名称，全帧与局部区域分开复用
+        """
+        if scale != 1.0:
+            height, width = region.shape[:2]
+            size = (max(1, int(round(width * scale))), max(1, int(round(height * scale))))
+            region = cv2.resize(region, size, dst=self.pool.get(f'{name}_small', (size[1], size[0], 3)))
+        return cv2.cvtColor(region, cv2.COLOR_BGR2RGB, dst=self.pool.get(f'{name}_rgb', region.shape))
+
+
+class FramePacket:
+    """采集线程发布的一帧画面"""
+    __slots__ = ('frame', 'timestamp', 'seq')
+
+    def __init__(self, frame, timestamp, seq):
+        self.frame = frame
+        self.timestamp = timestamp  # time.monotonic() 采集时刻
+        self.seq = seq  # 帧序号，从 1 开始递增
+
+
+class FrameGrabber(threading.Thread):
+    """
+    摄像头采集线程
+    持续从摄像头读取画面，只保留最新的一帧 (单槽位)，
+    避免驱动内部缓冲导致分析到的画面滞后，同时让分析线程不必等待 read()
+
+    画面直接读入循环使用的预分配缓冲区：
+    写入时会跳过 "最新一帧" 和 "分析线程正在使用的一帧"，三块缓冲区即可保证互不覆盖
+
+    画面来源为视频文件时 (离线测试)，按视频帧率节奏读取，播放到结尾后从头循环，模拟一直开着的摄像头
+    """
+
+    # 连续读取失败多少次后判定摄像头不可用
+    MAX_READ_FAILURES = 50
+    BUFFER_COUNT = 3
+
+    def __init__(self, camera_index=0):
+        super().__init__(daemon=True, name="frame-grabber")
+        self.camera_index = camera_index
+        self.running = False
+        self.failed = False
+
+        self._cond = threading.Condition()
+        self._latest = None
+        self._seq = 0
+
+        self._buffers = [None] * self.BUFFER_COUNT
+        self._latest_index = -1
+        self._in_use_index = -1
+
+    def start(self):
+        self.running = True
+        super().start()
+
+    def run(self):
+        cap = open_video_capture(self.camera_index)
+        if cap is None or not cap.isOpened():
+            print(f"[Capture] 无法打开摄像头 {self.camera_index}")
+            self._mark_failed()
+            return
+
+        failures = 0
+        video_file = is_video_file(self.camera_index)
+        frame_interval = 1.0 / (cap.get(cv2.CAP_PROP_FPS) or 25.0) if video_file else 0.0
+        deadline = time.monotonic()
+        try:
+            while self.running:
+                if video_file:
+                    deadline += frame_interval
+                    time.sleep(max(0.0, deadline - time.monotonic()))
+
+                index = self._free_buffer_index()
+                ret, frame = cap.read(self._buffers[index])
+                if not ret and video_file and failures == 0:
+                    # 视频播放结束：回到开头
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    ret, frame = cap.read(self._buffers[index])
+                if not ret:
+                    failures += 1
+                    if failures >= self.MAX_READ_FAILURES:
+                        print("[Capture] 摄像头连续读取失败，采集线程退出")
+                        self._mark_failed()
+                        break
+                    time.sleep(0.02)
+                    continue
+
+                failures = 0
+                # 首帧或分辨率变化时 read() 会返回新数组，之后都直接写入该缓冲区
+                self._buffers[index] = frame
+                with self._cond:
+                    self._seq += 1
+                    self._latest = FramePacket(frame, time.monotonic(), self._seq)
+                    self._latest_index = index
+                    self._cond.notify_all()
+        finally:
+            cap.release()
+
+    def _free_buffer_index(self):
+        """挑选一块既不是最新帧、也没有被分析线程占用的缓冲区"""
+        with self._cond:
+            for index in range(self.BUFFER_COUNT):
+                if index != self._latest_index and index != self._in_use_index:
+                    return index
+        return 0
+
+    def _mark_failed(self):
+        with self._cond:
+            self.failed = True
+            self._cond.notify_all()
+
+    def get_latest(self, after_seq=0, timeout=0.0):
+        """
+        获取最新一帧
+        :param after_seq: 只返回序号大于该值的帧 (即分析线程还没处理过的新帧)
+        :param timeout: 没有新帧时最多等待的秒数，0 表示立即返回
+        :return: FramePacket，没有新帧时返回 None
+                 返回的画面在下一次成功获取新帧之前不会被采集线程覆盖
+        """
+        with self._cond:
+            if timeout > 0:
+                self._cond.wait_for(lambda: self.failed or self._seq > after_seq, timeout)
+            if self._latest is None or self._latest.seq <= after_seq:
+                return None
+            self._in_use_index = self._latest_index
+            return self._latest
+
+    def stop(self, timeout=1.0):
+        """停止采集并释放摄像头"""
+        self.running = False
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout)
@@ -0,0 +1,157 @@
+import os
+import time
+from modules.lazy import lazy_import
+
+cv2 = lazy_import("cv2")
+face_recognition = lazy_import("face_recognition")
+
+
+class FaceDetector:
+    """
+    人脸检测器基类
+    输入为 RGB 图像，输出人脸框列表，格式与 face_recognition 一致: (top, right, bottom, left)
+    每次检测都会记录耗时，便于在不同机器上挑选合适的后端
+    """
+    name = "base"
+
+    def __init__(self):
+        self.calls = 0
+        self.total_time = 0.0
+        self.last_latency = 0.0
+
+    def detect(self, rgb_image):
+        start = time.perf_counter()
+        boxes = self._detect(rgb_image)
+        self.last_latency = time.perf_counter() - start
+        self.total_time += self.last_latency
+        self.calls += 1
+        return boxes
+
+    def _detect(self, rgb_image):
+        raise NotImplementedError
+
+    def stats(self):
+        """返回耗时统计 (毫秒)"""
+        avg = self.total_time / self.calls if self.calls else 0.0
+        return {
+            "name": self.name,
+            "calls": self.calls,
+            "avg_ms": round(avg * 1000, 2),
+            "last_ms": round(self.last_latency * 1000, 2),
+        }
+
+
+class HogDetector(FaceDetector):
+    """dlib HOG 检测器 (face_recognition 默认)，准确但较慢"""
+    name = "hog"
+
+    def __init__(self, upsample=1):
+        super().__init__()
+        self.upsample = int(upsample)
+
+    def _detect(self, rgb_image):
+        return face_recognition.face_locations(rgb_image, number_of_times_to_upsample=self.upsample)
+
+
+class HaarDetector(FaceDetector):
+    """OpenCV 级联分类器 (cv2 自带 Haar 模型，也可指定 LBP 等其它级联文件)，非常快但误检/漏检较多"""
+    name = "haar"
+
+    DEFAULT_CASCADE = "haarcascade_frontalface_default.xml"
+
+    def __init__(self, cascade_path=None, scale_factor=1.1, min_neighbors=5, min_size=40):
+        super().__init__()
+        if not cascade_path:
+            cascade_path = os.path.join(cv2.data.haarcascades, self.DEFAULT_CASCADE)
+        self.classifier = cv2.CascadeClassifier(cascade_path)
+        if self.classifier.empty():
+            raise FileNotFoundError(f"无法加载级联模型: {cascade_path}")
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_size = (min_size, min_size)
+
+    def _detect(self, rgb_image):
+        gray = cv2.cvtColor(rgb_image, cv2.COLOR_RGB2GRAY)
+        rects = self.classifier.detectMultiScale(gray, scaleFactor=self.scale_factor,
+                                                 minNeighbors=self.min_neighbors, minSize=self.min_size)
+        return [(int(y), int(x + w), int(y + h), int(x)) for (x, y, w, h) in rects]
+
+
+class YuNetDetector(FaceDetector):
+    """OpenCV DNN (YuNet) 检测器，需要本地的 onnx 模型文件，速度与准确率较均衡"""
+    name = "yunet"
+
+    def __init__(self, model_path, score_threshold=0.8):
+        super().__init__()
+        if not model_path or not os.path.exists(model_path):
+            raise FileNotFoundError(f"找不到 YuNet 模型文件: {model_path}")
+        self.detector = cv2.FaceDetectorYN.create(model_path, "", (320, 320), score_threshold)
+        self.input_size = (320, 320)
+
+    def _detect(self, rgb_image):
+        height, width = rgb_image.shape[:2]
+        if (width, height) != self.input_size:
+            self.detector.setInputSize((width, height))
+            self.input_size = (width, height)
+
+        bgr = cv2.cvtColor(rgb_image, cv2.COLOR_RGB2BGR)
+        _, faces = self.detector.detect(bgr)
+        if faces is None:
+            return []
+
+        boxes = []
+        for face in faces:
+            x, y, w, h = (int(v) for v in face[:4])
+            top, left = max(0, y), max(0, x)
+            boxes.append((top, min(width, x + w), min(height, y + h), left))
+        return boxes
+
+
+class CascadedDetector(FaceDetector):
+    """
+    级联模式：先用便宜的检测器过滤
+    - 没有人脸 -> 直接返回，跳过昂贵检测 (大部分空座位画面)
+    - 多张人脸 -> 直接返回 (多人即判定陌生人，无需精确人脸框)
+    - 单张人脸 -> 再用昂贵检测器确认并给出精确的人脸框用于提取特征
+    """
+    name = "cascade"
+
+    def __init__(self, cheap, expensive):
+        super().__init__()
+        self.cheap = cheap
+        self.expensive = expensive
+        self.name = f"cascade({cheap.name}->{expensive.name})"
+
+    def _detect(self, rgb_image):
+        boxes = self.cheap.detect(rgb_image)
+        if len(boxes) != 1:
+            return boxes
+        return self.expensive.detect(rgb_image)
+
+    def stats(self):
+        result = super().stats()
+        result["stages"] = [self.cheap.stats(), self.expensive.stats()]
+        return result
+
+
+# 设置中可选的检测器
+DETECTOR_CHOICES = ("hog", "haar", "yunet", "cascade")
+
+
+def create_detector(name="hog", yunet_model_path=None, upsample=1):
+    """
+    根据设置创建检测器，无法创建时回退到 HOG
+    :param name: 'hog' / 'haar' / 'yunet' / 'cascade' (Haar 过滤 + HOG 确认)
+    :param yunet_model_path: YuNet onnx 模型路径
+    :param upsample: HOG 上采样次数
+    """
+    try:
+        if name == "haar":
+            return HaarDetector()
+        if name == "yunet":
+            return YuNetDetector(yunet_model_path)
+        if name == "cascade":
+            return CascadedDetector(HaarDetector(), HogDetector(upsample))
+    except Exception as e:
+        print(f"[Detector] 无法创建检测器 '{name}'，回退到 HOG: {e}")
+    return HogDetector(upsample)
@@ -0,0 +1,109 @@
+import time
+import queue
+import threading
+
+
+class MonitorEvent:
+    """监控模块发布的触发事件"""
+    __slots__ = ('source', 'reason', 'confidence', 'timestamp')
+
+    def __init__(self, source, reason, confidence=None, timestamp=None):
+        self.source = source  # 事件来源: 'vision' / 'audio'
+        self.reason = reason  # 触发原因，用于日志显示
+        self.confidence = confidence  # 置信度 (0-1)，来源无法给出时为 None
+        self.timestamp = time.monotonic() if timestamp is None else timestamp  # 检测到的时刻
+
+    def __repr__(self):
+        conf = "" if self.confidence is None else f", {self.confidence:.2f}"
+        return f"<{self.source}: {self.reason}{conf}>"
+
+
+class EventBus:
+    """
+    线程安全的事件总线
+    视觉、语音等模块在各自线程中 publish，分发线程通过 get 立即取到，无需轮询
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+
+    def publish(self, source, reason, confidence=None, timestamp=None):
+        event = MonitorEvent(source, reason, confidence, timestamp)
+        self._queue.put(event)
+        return event
+
+    def get(self, timeout=None):
+        """取出下一个事件，超时返回 None"""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class TriggerDispatcher(threading.Thread):
+    """
+    触发事件分发线程
+    - 收到事件立即调用 handler(event)，不等待监控循环的下一轮
+    - 上次触发后的冷却时间内到达的事件 (包括多个模块同时触发) 合并为一次，只记录不重复执行
+    """
+
+    def __init__(self, bus, handler, cooldown, callback_log=print, accept=None):
+        """
+        :param handler: 执行保护的函数 handler(event)，在分发线程中调用
+        :param cooldown: 冷却时间 (秒)，可以是返回秒数的函数 (配置可能在运行中修改)
+        :param accept: 可选的过滤函数 accept(event)，返回 False 的事件直接丢弃 (如监控暂停期间)
+        """
+        super().__init__(daemon=True, name="trigger-dispatch")
+        self.bus = bus
+        self.handler = handler
+        self.cooldown = cooldown
+        self.callback_log = callback_log
+        self.accept = accept
+        self.running = True
+
+        self.last_fired = None
+        self.fired_count = 0
+        self.coalesced_count = 0
+
+    def _cooldown_seconds(self):
+        return float(self.cooldown() if callable(self.cooldown) else self.cooldown)
+
+    def cooldown_remaining(self, now=None):
+        """距冷却结束的剩余秒数，不在冷却期时返回 0 (供其他线程查询，只读 last_fired)"""
+        last_fired = self.last_fired
+        if last_fired is None:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        return max(0.0, last_fired + self._cooldown_seconds() - now)
+
+    def run(self):
+        while self.running:
+            event = self.bus.get(timeout=0.5)
+            if event is None:
+                continue
+            self.dispatch(event)
+
+    def dispatch(self, event):
+        if self.accept is not None and not self.accept(event):
+            self.callback_log(f"忽略触发事件: {event.reason}")
+            return False
+
+        if self.last_fired is not None and event.timestamp < self.last_fired + self._cooldown_seconds():
+            # 冷却期内：合并到上一次触发
+            self.coalesced_count += 1
+            self.callback_log(f"冷却中，合并触发事件: {event.reason}")
+            return False
+
+        self.last_fired = time.monotonic()
+        self.fired_count += 1
+        dispatch_ms = (self.last_fired - event.timestamp) * 1000
+        conf = "" if event.confidence is None else f"置信度 {event.confidence:.2f}, "
+        self.callback_log(f"触发事件 [{event.source}] {event.reason} ({conf}检测 → 分发 {dispatch_ms:.0f} ms)")
+        try:
+            self.handler(event)
+        except Exception as e:
+            self.callback_log(f"执行保护出错: {e}")
+        return True
+
+    def stop(self):
+        self.running = False
@@ -0,0 +1,90 @@
+import os
+import json
+import hashlib
+import numpy as np
+
+# 缓存格式版本，修改存储结构时递增即可让旧缓存全部失效
+CACHE_VERSION = 1
+# face_recognition 的特征维度
+ENCODING_DIM = 128
+
+
+def encoding_cache_key(image_bytes, params):
+    """
+    计算缓存键：照片内容哈希 + 编码模型及参数
+    照片被替换、或检测/编码参数变化时，键随之变化，旧缓存自然失效
+    """
+    h = hashlib.sha256()
+    h.update(image_bytes)
+    h.update(json.dumps({"version": CACHE_VERSION, "params": params}, sort_keys=True).encode('utf-8'))
+    return h.hexdigest()
+
+
+class FaceEncodingCache:
+    """
+    用户人脸特征的磁盘缓存
+    每张照片对应一个 <key>.npy 文件，内容为 (N, 128) 的特征矩阵
+    照片替换或参数变化后旧键不会再被用到，加载完全部照片后由 prune() 清理
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        # 本次加载读写过的键，prune() 时保留
+        self._used_keys = set()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npy")
+
+    def load(self, key):
+        """读取缓存，未命中或文件损坏时返回 None"""
+        self._used_keys.add(key)
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            encodings = np.load(path, allow_pickle=False)
+            if encodings.ndim != 2 or encodings.shape[1] != ENCODING_DIM:
+                raise ValueError(f"特征矩阵形状异常: {encodings.shape}")
+            return encodings
+        except Exception as e:
+            print(f"[FaceCache] 缓存文件无效，已删除: {e}")
+            self._remove(path)
+            return None
+
+    def save(self, key, encodings):
+        """写入缓存 (先写临时文件再替换，避免中途退出留下半个文件)"""
+        self._used_keys.add(key)
+        path = self._path(key)
+        tmp_path = path + ".tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            matrix = np.asarray(encodings, dtype=np.float64).reshape(-1, ENCODING_DIM)
+            with open(tmp_path, 'wb') as f:
+                np.save(f, matrix, allow_pickle=False)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"[FaceCache] 写入缓存失败: {e}")
+            self._remove(tmp_path)
+
+    def prune(self):
+        """删除本次未用到的缓存文件 (已替换的照片、旧参数下的特征)，返回删除的数量"""
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return 0
+
+        removed = 0
+        for name in names:
+            key, ext = os.path.splitext(name)
+            if ext == ".npy" and key not in self._used_keys:
+                self._remove(os.path.join(self.cache_dir, name))
+                removed += 1
+        return removed
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,98 @@
+from collections import deque
+
+
+class KeywordMatcher:
+    """
+    基于 Aho-Corasick 自动机的增量关键词匹配
+    - 所有关键词构建成一个自动机，每个字符只扫描一次，耗时与关键词数量基本无关
+    - Vosk 的部分结果 (partial) 随识别推进不断变长，只扫描新追加的字符
+    - 同一句话 (utterance) 内每个关键词只上报一次，句子结束 (final) 后重置
+    """
+
+    def __init__(self, keywords):
+        self.keywords = []
+        # 自动机：每个节点的转移表、失败指针、命中的关键词
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        for kw in keywords:
+            self._add(kw)
+        self._build_fail_links()
+        self.reset()
+
+    @staticmethod
+    def normalize(text):
+        """Vosk 中文结果的词与词之间有空格，去掉后再匹配"""
+        return text.replace(' ', '').lower()
+
+    def _add(self, keyword):
+        keyword = self.normalize(keyword)
+        if not keyword or keyword in self.keywords:
+            return
+        self.keywords.append(keyword)
+
+        node = 0
+        for ch in keyword:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[node][ch] = nxt
+            node = nxt
+        self._output[node].append(keyword)
+
+    def _build_fail_links(self):
+        """广度优先构建失败指针，并把后缀节点的输出合并进来"""
+        q = deque(self._goto[0].values())
+        while q:
+            node = q.popleft()
+            for ch, child in self._goto[node].items():
+                q.append(child)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                # 根节点的子节点失败指针指向根
+                self._fail[child] = self._goto[f].get(ch, 0) if node else 0
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def reset(self):
+        """开始新的一句话"""
+        self._state = 0
+        self._scanned = ""
+        self._found = set()
+
+    def _scan(self, text):
+        hits = []
+        state = self._state
+        for ch in text:
+            while state and ch not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(ch, 0)
+            for kw in self._output[state]:
+                if kw not in self._found:
+                    self._found.add(kw)
+                    hits.append(kw)
+        self._state = state
+        return hits
+
+    def feed(self, text, final=False):
+        """
+        输入当前这句话的识别结果 (部分结果或最终结果)
+        :param final: 是否为最终结果，是则匹配后重置，准备下一句
+        :return: 本次新命中的关键词列表
+        """
+        text = self.normalize(text)
+        if text.startswith(self._scanned):
+            # 常见情况：部分结果只是在末尾追加了新字
+            hits = self._scan(text[len(self._scanned):])
+        else:
+            # 识别器修正了前面的字：从头重新扫描 (已上报过的关键词不会重复上报)
+            self._state = 0
+            hits = self._scan(text)
+        self._scanned = text
+
+        if final:
+            self.reset()
+        return hits
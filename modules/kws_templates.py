@@ -0,0 +1,216 @@
+import os
+import time
+import wave
+import numpy as np
+from modules.mfcc import MfccExtractor
+from modules.vad import pcm_to_samples
+from modules.audio_source import SAMPLE_RATE, read_wav_16k
+
+# 录制样本时裁掉首尾静音使用的帧长 (毫秒) 与相对峰值能量的比例
+TRIM_FRAME_MS = 20
+TRIM_RATIO = 0.1
+
+
+def trim_silence(pcm, min_rms=100):
+    """裁掉录音首尾的静音，返回裁剪后的 16bit PCM 字节串 (整段都是静音时返回空串)"""
+    samples = pcm_to_samples(pcm)
+    frame = SAMPLE_RATE * TRIM_FRAME_MS // 1000
+    n_frames = samples.size // frame
+    if n_frames == 0:
+        return b""
+    energy = np.sqrt(np.mean(samples[:n_frames * frame].reshape(n_frames, frame) ** 2, axis=1))
+    voiced = np.flatnonzero(energy >= max(min_rms, energy.max() * TRIM_RATIO))
+    if voiced.size == 0:
+        return b""
+    # 前后各多保留一帧
+    start = max(0, voiced[0] - 1) * frame
+    end = min(n_frames, voiced[-1] + 2) * frame
+    return pcm[start * 2:end * 2]
+
+
+def normalize_features(feats):
+    """倒谱均值方差归一化 (CMVN)，减小麦克风与音量差异的影响"""
+    if len(feats) == 0:
+        return feats
+    return (feats - feats.mean(axis=0)) / (feats.std(axis=0) + 1e-5)
+
+
+def subsequence_dtw(template, stream):
+    """
+    子序列 DTW：模板可以从 stream 的任意位置开始、任意位置结束
+    步进限制为 (1,1) (1,2) (2,1)，每一行只依赖前两行，可以整行向量化
+    :param template: (M, D) 模板特征
+    :param stream: (N, D) 待搜索特征
+    :return: 每个结束位置的平均帧距离 (长度 N，无法到达的位置为 inf)
+    """
+    # 余弦距离矩阵 (M, N)
+    t = template / (np.linalg.norm(template, axis=1, keepdims=True) + 1e-8)
+    s = stream / (np.linalg.norm(stream, axis=1, keepdims=True) + 1e-8)
+    dist = 1.0 - t @ s.T
+
+    m, n = dist.shape
+    inf = np.float32(np.inf)
+    prev2 = np.full(n, inf, dtype=np.float32)
+    prev = dist[0].astype(np.float32)  # 第一行：任意起点
+    for i in range(1, m):
+        cur = np.full(n, inf, dtype=np.float32)
+        # (1,1): 来自 prev[j-1]
+        cur[1:] = prev[:-1]
+        # (1,2): 来自 prev[j-2]
+        np.minimum(cur[2:], prev[:-2], out=cur[2:])
+        # (2,1): 来自 prev2[j-1]
+        np.minimum(cur[1:], prev2[:-1], out=cur[1:])
+        cur += dist[i]
+        prev2, prev = prev, cur
+    return prev / m
+
+
+class KeywordTemplates:
+    """
+    关键词录音样本库
+    目录结构：<root>/<关键词>/<时间戳>.wav (16kHz 单声道 16bit)
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def keyword_dir(self, keyword):
+        return os.path.join(self.root, keyword)
+
+    def samples(self, keyword):
+        folder = self.keyword_dir(keyword)
+        if not os.path.isdir(folder):
+            return []
+        return sorted(os.path.join(folder, f) for f in os.listdir(folder) if f.lower().endswith(".wav"))
+
+    def count(self, keyword):
+        return len(self.samples(keyword))
+
+    def save_sample(self, keyword, pcm):
+        """保存一段 16kHz 单声道 16bit PCM 录音，返回文件路径"""
+        folder = self.keyword_dir(keyword)
+        os.makedirs(folder, exist_ok=True)
+        stamp = time.strftime("%Y%m%d_%H%M%S")
+        path = os.path.join(folder, stamp + ".wav")
+        index = 1
+        while os.path.exists(path):
+            path = os.path.join(folder, f"{stamp}_{index}.wav")
+            index += 1
+        with wave.open(path, 'wb') as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(SAMPLE_RATE)
+            wf.writeframes(pcm)
+        return path
+
+    def clear(self, keyword):
+        for path in self.samples(keyword):
+            os.remove(path)
+
+
+class TemplateSpotter:
+    """
+    关键词初筛 (两级检测的第一级)
+    - 对语音段计算 MFCC，用子序列 DTW 与每个关键词的录音样本比对
+    - 距离低于门限即报告候选，由 Vosk 识别器确认；其余语音不进入识别器
+    - 门限由同一关键词样本之间的互相距离估计，样本越一致门限越严
+    """
+
+    # 只有一个样本时的默认门限 (平均余弦距离)
+    DEFAULT_THRESHOLD = 0.35
+
+    def __init__(self, templates, keywords, mfcc_conf=None, threshold_scale=1.3, check_interval_ms=100):
+        """
+        :param templates: KeywordTemplates 样本库
+        :param keywords: 需要初筛的关键词列表 (必须都有样本)
+        :param mfcc_conf: Vosk 模型的 mfcc.conf 路径，用于保持特征参数一致
+        :param threshold_scale: 门限相对样本间平均距离的倍数，越大越容易触发
+        :param check_interval_ms: 每积累多少毫秒新语音做一次比对
+        """
+        self.extractor = MfccExtractor.from_conf(mfcc_conf)
+        self.threshold_scale = threshold_scale
+        self.check_samples = int(SAMPLE_RATE * check_interval_ms / 1000)
+
+        # 关键词 -> [模板特征]；关键词 -> 门限
+        self.templates = {}
+        self.thresholds = {}
+        for kw in keywords:
+            feats = []
+            for path in templates.samples(kw):
+                pcm, _ = read_wav_16k(path)
+                f = self.extractor.compute(pcm_to_samples(pcm))
+                if len(f) >= 10:
+                    feats.append(normalize_features(f))
+            if feats:
+                self.templates[kw] = feats
+                self.thresholds[kw] = self._estimate_threshold(feats)
+
+        self.missing = [kw for kw in keywords if kw not in self.templates]
+
+        # 搜索窗口：最长模板的 1.5 倍
+        longest = max((len(f) for feats in self.templates.values() for f in feats), default=100)
+        self.window_samples = self.extractor.frame_len + int(longest * 1.5) * self.extractor.hop
+        self.reset()
+
+        # 统计
+        self.checks = 0
+        self.candidates = 0
+        self.last_distance = None
+
+    def _estimate_threshold(self, feats):
+        if len(feats) < 2:
+            return self.DEFAULT_THRESHOLD
+        distances = []
+        for i, a in enumerate(feats):
+            for b in feats[i + 1:]:
+                # 较短的作为模板，在较长的里面搜索
+                short, long_ = (a, b) if len(a) <= len(b) else (b, a)
+                distances.append(float(subsequence_dtw(short, long_).min()))
+        return float(np.mean(distances)) * self.threshold_scale
+
+    @property
+    def ready(self):
+        return bool(self.templates)
+
+    def reset(self):
+        """清空缓冲 (一段语音结束时调用)"""
+        self._audio = b""
+        self._pending = 0
+
+    def recent_audio(self):
+        """最近一个搜索窗口内的语音，候选命中时交给识别器确认"""
+        return self._audio
+
+    def feed(self, pcm):
+        """
+        输入一段语音
+        :return: 命中的候选关键词，没有则返回 None
+        """
+        self._audio = (self._audio + pcm)[-self.window_samples * 2:]
+        self._pending += len(pcm) // 2
+        if self._pending < self.check_samples:
+            return None
+        self._pending = 0
+
+        stream = self.extractor.compute(pcm_to_samples(self._audio))
+        if len(stream) < 10:
+            return None
+        stream = normalize_features(stream)
+        self.checks += 1
+
+        best_kw, best_margin, best_dist = None, None, None
+        for kw, feats in self.templates.items():
+            threshold = self.thresholds[kw]
+            for template in feats:
+                if len(template) > 2 * len(stream):
+                    continue
+                dist = float(subsequence_dtw(template, stream).min())
+                margin = dist - threshold
+                if best_margin is None or margin < best_margin:
+                    best_kw, best_margin, best_dist = kw, margin, dist
+        self.last_distance = best_dist
+
+        if best_margin is not None and best_margin <= 0:
+            self.candidates += 1
+            return best_kw
+        return None
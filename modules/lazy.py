@@ -0,0 +1,72 @@
+import time
+import threading
+import importlib
+
+# 启动阶段延迟导入的重量级依赖 (界面显示后由预热线程在后台加载)
+HEAVY_MODULES = ("cv2", "face_recognition", "vosk", "pyaudio", "PIL.Image", "PIL.ImageTk", "pyautogui")
+
+
+class LazyModule:
+    """
+    延迟导入的模块代理
+    首次访问属性时才真正 import，之后直接转发到真实模块
+    用法：cv2 = lazy_import("cv2")，代码中照常写 cv2.resize(...)
+    """
+
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            # import 自带模块级的锁，多个线程同时首次访问也只会真正导入一次
+            module = importlib.import_module(self.__dict__['_name'])
+            self.__dict__['_module'] = module
+        return module
+
+    @property
+    def loaded(self):
+        return self.__dict__['_module'] is not None
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __repr__(self):
+        state = "已加载" if self.loaded else "未加载"
+        return f"<LazyModule {self.__dict__['_name']} ({state})>"
+
+
+def lazy_import(name):
+    return LazyModule(name)
+
+
+def warm_up(names=HEAVY_MODULES, callback_log=print):
+    """
+    依次导入重量级依赖，记录每个模块的耗时 (已导入的模块几乎不耗时)
+    应在界面显示后于后台线程调用，让用户首次启动监控时不再等待导入
+    :return: {模块名: 耗时秒数}，导入失败的模块不在其中
+    """
+    timings = {}
+    for name in names:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            callback_log(f"[预热] 导入 {name} 失败: {e}")
+            continue
+        timings[name] = time.perf_counter() - start
+    total = sum(timings.values())
+    detail = ", ".join(f"{name} {t * 1000:.0f} ms" for name, t in timings.items())
+    callback_log(f"[预热] 后台加载依赖完成，共 {total * 1000:.0f} ms ({detail})")
+    return timings
+
+
+def start_warm_up(names=HEAVY_MODULES, callback_log=print):
+    """启动后台预热线程"""
+    thread = threading.Thread(target=warm_up, args=(names, callback_log), daemon=True, name="warm-up")
+    thread.start()
+    return thread
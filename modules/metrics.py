@@ -0,0 +1,246 @@
+import json
+import time
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 耗时直方图的分桶上限 (秒)，覆盖 1ms ~ 5s
+BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0)
+
+# Prometheus 指标名前缀
+PREFIX = "touchfish_"
+
+
+class Histogram:
+    """固定分桶的耗时直方图，分位数按所在桶的上限近似"""
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # 最后一个桶为 +Inf
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q):
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for bound, n in zip(BUCKETS, self.counts):
+            cumulative += n
+            if cumulative >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total / self.count * 1000, 2) if self.count else 0.0,
+            "p50_ms": round(self.quantile(0.5) * 1000, 2),
+            "p95_ms": round(self.quantile(0.95) * 1000, 2),
+            "max_ms": round(self.max * 1000, 2),
+        }
+
+
+class _NullTimer:
+    """关闭统计时使用的空计时器：不读时钟，不加锁"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ('registry', 'name', 'start')
+
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class MetricsRegistry:
+    """
+    各阶段耗时 / 计数 / 当前值的统计
+    默认关闭：关闭时 timer() 返回空计时器，inc/observe/set_gauge 只做一次属性判断就返回
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.started = time.monotonic()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.monotonic()
+            self.counters = {}
+            self.gauges = {}
+            self.histograms = {}
+
+    def timer(self, name):
+        """用法：with METRICS.timer("vision_detect"): ..."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name)
+
+    def observe(self, name, seconds):
+        if not self.enabled:
+            return
+        with self._lock:
+            hist = self.histograms.get(name)
+            if hist is None:
+                hist = self.histograms[name] = Histogram()
+            hist.observe(seconds)
+
+    def inc(self, name, value=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set_gauge(self, name, value):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.gauges[name] = value
+
+    def snapshot(self):
+        """JSON 格式的全部指标"""
+        with self._lock:
+            return {
+                "uptime_seconds": round(time.monotonic() - self.started, 1),
+                "counters": dict(self.counters),
+                "gauges": dict(self.gauges),
+                "timers": {name: hist.to_dict() for name, hist in self.histograms.items()},
+            }
+
+    def render_prometheus(self):
+        """Prometheus 文本格式"""
+        lines = []
+        with self._lock:
+            for name, value in sorted(self.counters.items()):
+                metric = f"{PREFIX}{name}_total"
+                lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+            for name, value in sorted(self.gauges.items()):
+                metric = f"{PREFIX}{name}"
+                lines += [f"# TYPE {metric} gauge", f"{metric} {value}"]
+            for name, hist in sorted(self.histograms.items()):
+                metric = f"{PREFIX}{name}_seconds"
+                lines.append(f"# TYPE {metric} histogram")
+                cumulative = 0
+                for bound, n in zip(BUCKETS, hist.counts):
+                    cumulative += n
+                    lines.append(f'{metric}_bucket{{le="{bound:g}"}} {cumulative}')
+                lines.append(f'{metric}_bucket{{le="+Inf"}} {hist.count}')
+                lines.append(f"{metric}_sum {hist.total:.6f}")
+                lines.append(f"{metric}_count {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """一行汇总：各阶段平均 / p95 耗时与次数"""
+        with self._lock:
+            parts = [f"{name} 平均 {hist.total / hist.count * 1000:.1f}ms p95 {hist.quantile(0.95) * 1000:.0f}ms ({hist.count}次)"
+                     for name, hist in sorted(self.histograms.items()) if hist.count]
+            parts += [f"{name}={value}" for name, value in sorted(self.counters.items())]
+        return "; ".join(parts) if parts else "暂无数据"
+
+
+# 全局统计实例，各模块直接使用
+METRICS = MetricsRegistry()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = METRICS
+
+    def do_GET(self):
+        path = self.path.split('?', 1)[0]
+        if path == "/metrics":
+            body = self.registry.render_prometheus().encode('utf-8')
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        elif path == "/metrics.json":
+            body = json.dumps(self.registry.snapshot(), ensure_ascii=False).encode('utf-8')
+            content_type = "application/json; charset=utf-8"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # 不在控制台打印每次抓取
+        pass
+
+
+class MetricsExporter:
+    """
+    导出统计数据：
+    - 本机 HTTP 接口 http://127.0.0.1:端口/metrics (Prometheus 文本) 与 /metrics.json
+    - 每隔 summary_interval 秒输出一行汇总日志 (0 表示不输出)
+    """
+
+    def __init__(self, registry=METRICS, port=9464, summary_interval=60, callback_log=print):
+        self.registry = registry
+        self.port = port
+        self.summary_interval = summary_interval
+        self.callback_log = callback_log
+        self.server = None
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        if self.port:
+            try:
+                handler = type("MetricsHandler", (_MetricsHandler,), {"registry": self.registry})
+                # 只监听本机地址
+                self.server = ThreadingHTTPServer(("127.0.0.1", int(self.port)), handler)
+                self.server.daemon_threads = True
+                self._spawn(self.server.serve_forever, "metrics-http")
+                self.callback_log(f"[指标] 统计接口: http://127.0.0.1:{self.server.server_port}/metrics")
+            except OSError as e:
+                self.server = None
+                self.callback_log(f"[指标] 统计接口启动失败 (端口 {self.port}): {e}")
+        if self.summary_interval and self.summary_interval > 0:
+            self._spawn(self._summary_loop, "metrics-summary")
+        return self
+
+    def _spawn(self, target, name):
+        thread = threading.Thread(target=target, daemon=True, name=name)
+        thread.start()
+        self._threads.append(thread)
+
+    def _summary_loop(self):
+        while not self._stop.wait(self.summary_interval):
+            self.callback_log(f"[指标] {self.registry.summary()}")
+
+    def stop(self):
+        self._stop.set()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
@@ -0,0 +1,105 @@
+import os
+import numpy as np
+
+# 与 Vosk 模型 conf/mfcc.conf 一致的默认参数 (其余为 Kaldi 默认值)
+DEFAULT_MFCC_CONF = {
+    "sample_frequency": 16000,
+    "frame_length": 25.0,  # 毫秒
+    "frame_shift": 10.0,  # 毫秒
+    "num_mel_bins": 40,
+    "num_ceps": 40,
+    "low_freq": 40.0,
+    "high_freq": -200.0,  # <= 0 表示相对奈奎斯特频率的偏移
+    "preemphasis_coefficient": 0.97,
+    "cepstral_lifter": 22.0,
+}
+
+
+def load_mfcc_conf(path):
+    """
+    读取 Kaldi 风格的 mfcc.conf (每行 --key=value)，只保留本模块支持的参数
+    文件不存在时返回默认参数
+    """
+    conf = dict(DEFAULT_MFCC_CONF)
+    if not path or not os.path.exists(path):
+        return conf
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if not line.startswith('--') or '=' not in line:
+                continue
+            key, value = line[2:].split('=', 1)
+            key = key.replace('-', '_')
+            if key in conf:
+                conf[key] = type(conf[key])(float(value))
+    return conf
+
+
+def _mel(freq):
+    return 1127.0 * np.log(1.0 + freq / 700.0)
+
+
+class MfccExtractor:
+    """
+    NumPy 实现的 MFCC 特征 (与 Kaldi compute-mfcc-feats 流程一致：预加重、Povey 窗、梅尔滤波器组、DCT、倒谱提升)
+    数值不要求与 Kaldi 逐位一致，只用于关键词模板匹配
+    """
+
+    def __init__(self, sample_frequency=16000, frame_length=25.0, frame_shift=10.0, num_mel_bins=40, num_ceps=40,
+                 low_freq=40.0, high_freq=-200.0, preemphasis_coefficient=0.97, cepstral_lifter=22.0):
+        self.sample_rate = int(sample_frequency)
+        self.frame_len = int(self.sample_rate * frame_length / 1000)
+        self.hop = int(self.sample_rate * frame_shift / 1000)
+        self.preemph = preemphasis_coefficient
+        self.n_fft = 1 << (self.frame_len - 1).bit_length()
+
+        # Povey 窗 (Hann 窗的 0.85 次方)
+        n = np.arange(self.frame_len)
+        self.window = (0.5 - 0.5 * np.cos(2 * np.pi * n / (self.frame_len - 1))) ** 0.85
+
+        # 梅尔三角滤波器组
+        nyquist = self.sample_rate / 2
+        high = high_freq if high_freq > 0 else nyquist + high_freq
+        mel_points = np.linspace(_mel(low_freq), _mel(high), num_mel_bins + 2)
+        fft_mel = _mel(np.arange(self.n_fft // 2 + 1) * self.sample_rate / self.n_fft)
+        left, center, right = mel_points[:-2, None], mel_points[1:-1, None], mel_points[2:, None]
+        up = (fft_mel - left) / (center - left)
+        down = (right - fft_mel) / (right - center)
+        self.mel_banks = np.maximum(0.0, np.minimum(up, down)).astype(np.float32)
+
+        # DCT-II (正交归一化) 与倒谱提升
+        k = np.arange(num_ceps)[:, None]
+        m = np.arange(num_mel_bins)[None, :]
+        dct = np.sqrt(2.0 / num_mel_bins) * np.cos(np.pi * k * (m + 0.5) / num_mel_bins)
+        dct[0] /= np.sqrt(2.0)
+        lifter = 1.0 + 0.5 * cepstral_lifter * np.sin(np.pi * np.arange(num_ceps) / cepstral_lifter)
+        self.dct = (dct * lifter[:, None]).T.astype(np.float32)
+
+    @classmethod
+    def from_conf(cls, path):
+        return cls(**load_mfcc_conf(path))
+
+    def num_frames(self, num_samples):
+        if num_samples < self.frame_len:
+            return 0
+        return 1 + (num_samples - self.frame_len) // self.hop
+
+    def compute(self, samples):
+        """
+        :param samples: float32 采样数组 (数值范围与 16bit 整数相同)
+        :return: (帧数, num_ceps) 的 float32 特征矩阵
+        """
+        n_frames = self.num_frames(samples.size)
+        if n_frames == 0:
+            return np.zeros((0, self.dct.shape[1]), dtype=np.float32)
+
+        idx = np.arange(self.frame_len)[None, :] + self.hop * np.arange(n_frames)[:, None]
+        frames = samples[idx].astype(np.float32)
+        frames -= frames.mean(axis=1, keepdims=True)
+        frames[:, 1:] = frames[:, 1:] - self.preemph * frames[:, :-1]
+        frames[:, 0] *= 1.0 - self.preemph
+        frames *= self.window
+
+        power = np.abs(np.fft.rfft(frames, n=self.n_fft, axis=1)) ** 2
+        log_mel = np.log(np.maximum(power @ self.mel_banks.T, 1e-10))
+        return (log_mel @ self.dct).astype(np.float32)
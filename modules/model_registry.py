@@ -0,0 +1,77 @@
+import os
+import threading
+from modules.lazy import lazy_import
+
+vosk = lazy_import("vosk")
+
+# 进程级共享资源：
+# - Vosk 模型按路径只加载一次，启停监控、修改关键词时直接复用 (新建 KaldiRecognizer 很便宜，模型不便宜)
+# - PyAudio 实例全局复用，避免每次启动监控/噪音检测都重新初始化音频设备
+_lock = threading.Lock()
+_models = {}  # 绝对路径 -> [Model, 引用计数]
+_pyaudio = None
+
+
+def acquire_model(model_path):
+    """
+    获取 (必要时加载) 指定路径的 Vosk 模型，引用计数 +1
+    加载新路径的模型时，会顺便释放其它已不再使用的模型，避免内存中同时驻留多份
+    """
+    key = os.path.abspath(model_path)
+    with _lock:
+        entry = _models.get(key)
+        if entry is not None:
+            entry[1] += 1
+            print(f"[Audio] 复用已加载的语音模型: {key}")
+            return entry[0]
+
+        _purge_unused_locked()
+        print(f"正在加载本地语音模型: {model_path} ...")
+        # Vosk 会自动在 model_path 下寻找 final.mdl 等文件
+        model = vosk.Model(model_path)
+        _models[key] = [model, 1]
+        return model
+
+
+def release_model(model_path):
+    """
+    引用计数 -1
+    计数归零后模型仍保留在缓存中，下次启动监控可立即复用
+    """
+    key = os.path.abspath(model_path)
+    with _lock:
+        entry = _models.get(key)
+        if entry is not None and entry[1] > 0:
+            entry[1] -= 1
+
+
+def purge_unused_models():
+    """释放所有引用计数为 0 的模型"""
+    with _lock:
+        _purge_unused_locked()
+
+
+def _purge_unused_locked():
+    for key in [k for k, (_, refs) in _models.items() if refs <= 0]:
+        print(f"[Audio] 释放不再使用的语音模型: {key}")
+        del _models[key]
+
+
+def get_pyaudio():
+    """获取全局共享的 PyAudio 实例 (首次调用时创建)"""
+    global _pyaudio
+    with _lock:
+        if _pyaudio is None:
+            # 延迟导入：离线回放 (WAV 文件) 等场景无需安装 PyAudio
+            import pyaudio
+            _pyaudio = pyaudio.PyAudio()
+        return _pyaudio
+
+
+def terminate_pyaudio():
+    """程序退出时调用，释放 PyAudio"""
+    global _pyaudio
+    with _lock:
+        if _pyaudio is not None:
+            _pyaudio.terminate()
+            _pyaudio = None
@@ -0,0 +1,398 @@
+import os
+import sys
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from settings_manager import BASE_DIR
+from modules.vision import VisionMonitor
+from modules.audio import AudioMonitor
+from modules.scheduler import SampleScheduler
+from modules.events import EventBus, TriggerDispatcher
+from modules.startup import PhaseTimer
+from modules.metrics import METRICS, MetricsExporter
+from modules.profiler import start_profiler
+
+
+# --- 资源路径查找 ---
+def get_resource_path(relative_path):
+    """
+    智能查找资源路径
+    """
+    # 1. 本地开发环境 (IDE运行)
+    if not getattr(sys, 'frozen', False):
+        # 在 IDE 中，使用项目根目录 (本文件位于 modules/ 下) 作为基准
+        base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        return os.path.join(base_path, relative_path)
+
+    # 2. 打包发布环境 (EXE运行)
+    base_dir = os.path.dirname(sys.executable) # exe 所在目录
+
+    # 路径A: 在 exe 同级目录下找
+    path_root = os.path.join(base_dir, relative_path)
+    if os.path.exists(path_root):
+        return path_root
+
+    # 路径B: 在 _internal 目录下找
+    path_internal = os.path.join(base_dir, '_internal', relative_path)
+    if os.path.exists(path_internal):
+        return path_internal
+
+    # 如果都找不到，默认返回 exe 同级目录
+    return path_root
+
+
+def resolve_user_path(path):
+    """用户配置的路径：优先检查绝对路径，其次检查资源路径"""
+    if path and not os.path.exists(path):
+        res_path = get_resource_path(path)
+        if os.path.exists(res_path):
+            return res_path
+    return path
+
+
+def get_template_dir(settings):
+    """关键词录音样本目录 (相对路径基于软件目录)"""
+    path = settings.get('keyword_template_dir', 'keyword_templates') or 'keyword_templates'
+    return path if os.path.isabs(path) else os.path.join(BASE_DIR, path)
+
+
+def resolve_user_paths(paths):
+    """同 resolve_user_path，兼容单个路径或路径列表"""
+    if isinstance(paths, (list, tuple)):
+        return [resolve_user_path(p) for p in paths]
+    return resolve_user_path(paths)
+
+
+class MonitorThread(threading.Thread):
+    def __init__(self, settings, callback_trigger, callback_log, callback_finished,
+                 camera_source=None, audio_source=None):
+        """
+        :param callback_trigger: 执行保护 callback_trigger(event)
+        :param callback_log: 输出日志 callback_log(msg)
+        :param callback_finished: 监控线程退出时调用
+        :param camera_source: 代替 settings 中摄像头索引的画面来源 (视频文件路径)，用于离线测试
+        :param audio_source: 代替麦克风的音频来源 (如 WavFileSource)，用于离线测试
+        """
+        super().__init__(name="monitor")
+        self.settings = settings
+        self.camera_source = camera_source
+        self.audio_source = audio_source
+        self.callback_trigger = callback_trigger
+        self.callback_log = callback_log
+        self.callback_finished = callback_finished
+        self.running = True
+        self.paused = False
+
+        # 连续帧计数只在监控线程中读写 (冷却由分发线程判定，监控循环据此清零)
+        self.stranger_counter = 0
+        self.absence_counter = 0
+        # 音频监控实例，界面据此实时显示噪声门限
+        self.audio_mon = None
+        # 各监控模块把触发事件发布到总线，由分发线程立即执行保护
+        self.bus = EventBus()
+        self.dispatcher = None
+        self.timer = None
+        # 停止时的最终统计 (未开启统计时为 None)，全局统计在停止后即关闭并清空
+        self.metrics_snapshot = None
+
+    def _create_vision(self):
+        """创建视觉监控 (不含照片编码，耗时很短)"""
+        cam_idx = self.camera_source if self.camera_source is not None else int(self.settings.get('camera_index', 0))
+        # 图片路径处理：找到用户设置的真实文件 (或文件夹)
+        raw_img_path = resolve_user_paths(self.settings.get('user_image_path', ""))
+
+        # 其他授权人员
+        profiles = []
+        for profile in self.settings.get('user_profiles', []) or []:
+            profile = dict(profile)
+            profile['images'] = resolve_user_paths(profile.get('images', []))
+            profiles.append(profile)
+
+        p_scale = float(self.settings.get('process_scale', 0.5))
+        target_latency = None
+        if self.settings.get('auto_scale', False):
+            target_latency = float(self.settings.get('target_latency_ms', 120)) / 1000
+
+        vision_mon = VisionMonitor(
+            user_image_path=raw_img_path,
+            tolerance=float(self.settings.get('tolerance', 0.6)),
+            camera_index=cam_idx,
+            process_scale=p_scale,
+            reverify_interval=float(self.settings.get('face_reverify_interval', 3.0)),
+            cache_dir=os.path.join(BASE_DIR, 'face_cache'),
+            profiles=profiles,
+            motion_threshold=float(self.settings.get('motion_threshold', 4.0)),
+            motion_refresh_interval=float(self.settings.get('motion_refresh_interval', 5.0)),
+            roi_sweep_seconds=float(self.settings.get('roi_sweep_seconds', 2.0)),
+            roi_scale=float(self.settings.get('roi_scale', 1.0)),
+            detector=self.settings.get('face_detector', 'hog'),
+            yunet_model_path=resolve_user_path(self.settings.get('yunet_model_path', "")),
+            target_latency=target_latency,
+            defer_profiles=True
+        )
+        return vision_mon
+
+    def _load_vision(self, vision_mon, timer):
+        """线程池任务：编码用户照片"""
+        ready = vision_mon.load_pending_profiles()
+        timer.mark("视觉: 照片特征加载完成")
+        return ready
+
+    def _create_audio(self, timer):
+        """线程池任务：加载语音模型并开始监听，失败返回 None"""
+        try:
+            model_path = get_resource_path("model")
+
+            # 仅在打包环境 (frozen) 下尝试 Fallback 查找
+            # 只有在打包成 exe 后，才有可能出现 _internal 这种结构
+            if getattr(sys, 'frozen', False):
+                if not os.path.exists(model_path):
+                    base = os.path.dirname(sys.executable)
+                    fallback = os.path.join(base, '_internal', 'model')
+                    if os.path.exists(fallback):
+                        model_path = fallback
+
+            self.callback_log(f"加载语音模型: {model_path}")
+
+            audio_mon = AudioMonitor(
+                keywords_str=self.settings.get('voice_keywords', ""),
+                model_path=model_path,
+                energy_threshold=int(self.settings.get('voice_energy_threshold', 300)),
+                grammar_mode=bool(self.settings.get('voice_grammar_mode', False)),
+                vad_hangover_ms=int(self.settings.get('vad_hangover_ms', 400)),
+                vad_preroll_ms=int(self.settings.get('vad_preroll_ms', 300)),
+                # 至少 10ms (配置为 0 或负数时按最小值处理)
+                chunk_ms=max(10, int(self.settings.get('voice_chunk_ms', 100))),
+                adaptive_threshold=bool(self.settings.get('voice_adaptive_threshold', True)),
+                noise_floor_ratio=float(self.settings.get('noise_floor_ratio', 2.5)),
+                template_dir=get_template_dir(self.settings) if self.settings.get('voice_template_stage', False) else None,
+                template_threshold_scale=float(self.settings.get('template_threshold_scale', 1.3)),
+                confirm_ms=int(self.settings.get('template_confirm_ms', 1500)),
+                audio_source=self.audio_source,
+                # 识别线程检测到关键词后直接发布事件，不等待监控循环轮询
+                on_detect=lambda kw, pos, conf: self.bus.publish('audio', f"语音关键词匹配: {kw}", confidence=conf)
+            )
+            self.audio_mon = audio_mon
+            # 监听线程已在构造时启动，从此刻起语音即可触发保护
+            timer.mark("语音: 模型加载完成，语音保护生效")
+            timer.mark("首个保护生效")
+            return audio_mon
+        except Exception as e:
+            self.callback_log(f"音频模块警告: {e}")
+            self.callback_log("--> 提示: 请确认 'model' 文件夹存在于软件目录中。")
+            return None
+
+    def run(self):
+        exporter = None
+        try:
+            self.callback_log("正在初始化 AI 引擎 (视觉与语音并行加载)...")
+            timer = self.timer = PhaseTimer(self.callback_log)
+            exporter = self._start_metrics()
+            if self.settings.get('profiler_on_start', False):
+                # 从初始化开始采样，模型加载、照片编码的耗时也包含在内
+                start_profiler(BASE_DIR,
+                               duration=float(self.settings.get('profiler_seconds', 30)),
+                               interval_ms=int(self.settings.get('profiler_interval_ms', 10)),
+                               callback_log=self.callback_log)
+
+            # 分发线程最先启动：任何一个子系统就绪后即可触发保护，不必等其它子系统
+            self.dispatcher = TriggerDispatcher(self.bus, self._on_event,
+                                                cooldown=lambda: int(self.settings.get('cooling_time', 10)),
+                                                callback_log=self.callback_log,
+                                                accept=lambda event: not self.paused)
+            self.dispatcher.start()
+
+            # 视觉照片编码、语音模型加载 (含 PyAudio 打开) 在线程池中并行进行，
+            # 摄像头由采集线程打开，也与它们同时进行
+            pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="engine-init")
+
+            # --- 1. 初始化视觉 ---
+            vision_mon = None
+            vision_future = None
+            try:
+                vision_mon = self._create_vision()
+                if vision_mon.has_pending_images:
+                    vision_mon.start_camera()
+                    timer.mark("视觉: 检测器就绪，摄像头打开中")
+                    vision_future = pool.submit(self._load_vision, vision_mon, timer)
+                else:
+                    self.callback_log("❌ 视觉警告：未设置用户照片！")
+                    self.callback_log("--> 摄像头将【不会启动】。请先在'视觉识别'页浏览并选择您的照片。")
+            except Exception as e:
+                self.callback_log(f"视觉模块初始化异常: {e}")
+
+            # --- 2. 初始化音频 ---
+            audio_mon = None
+            audio_future = pool.submit(self._create_audio, timer)
+            pool.shutdown(wait=False)
+
+            # --- 3. 各子系统就绪后分别上线 ---
+            vision_active = False
+            audio_active = False
+            startup_reported = False
+            was_cooling = False
+
+            self.callback_log(">>> 监控循环已开始 <<<")
+
+            scheduler = SampleScheduler(
+                base_interval=float(self.settings.get('sample_interval', 0.5)),
+                idle_interval=float(self.settings.get('idle_sample_interval', 1.0)),
+                alert_interval=float(self.settings.get('alert_sample_interval', 0.1)),
+                idle_after=float(self.settings.get('idle_after', 30))
+            )
+
+            while self.running:
+                if vision_future is not None and vision_future.done():
+                    vision_future = None
+                    if vision_mon.is_ready:
+                        controller = vision_mon.scale_controller
+                        scale_text = f"自动, 目标 {controller.target_latency * 1000:.0f}ms" if controller \
+                            else vision_mon.process_scale
+                        self.callback_log(f"✔ 视觉监控就绪 (画质: {scale_text}, 检测器: {vision_mon.detector.name})")
+                        vision_active = True
+                    else:
+                        vision_mon.stop_camera()
+                        self.callback_log("❌ 视觉警告：照片中没有可用的人脸！摄像头已关闭，请更换照片。")
+
+                if audio_future is not None and audio_future.done():
+                    audio_mon = audio_future.result()
+                    audio_future = None
+                    if audio_mon:
+                        self.callback_log("✔ 语音监控：已就绪")
+                        audio_active = True
+
+                if vision_future is None and audio_future is None and not startup_reported:
+                    startup_reported = True
+                    if not vision_active and not audio_active:
+                        self.callback_log("⚠️ 警告：视觉和语音均未就绪，监控实际上在空转。")
+                    else:
+                        self.callback_log(f"[启动] 各阶段耗时: {timer.summary()}")
+
+                if self.paused:
+                    # 恢复后重新累计
+                    self.stranger_counter = 0
+                    self.absence_counter = 0
+                    time.sleep(1)
+                    scheduler.reset()
+                    continue
+
+                loop_start = time.perf_counter() if METRICS.enabled else None
+
+                # 冷却期以分发线程的上次触发时间为准；进入或结束冷却时清零计数
+                # 冷却结束后从最新状态继续判定 (摄像头、跟踪、噪声估计在冷却期间一直在运行)
+                cooling = self.dispatcher.cooldown_remaining() > 0
+                if cooling != was_cooling:
+                    was_cooling = cooling
+                    self.stranger_counter = 0
+                    self.absence_counter = 0
+                    if not cooling:
+                        self.callback_log("冷却结束，恢复监控。")
+
+                # --- 视觉检测 (仅当准备好时才执行) ---
+                status = None
+                if vision_active and vision_mon:
+                    # get_status 内部会尝试打开摄像头
+                    # 冷却期间照常分析画面 (保持跟踪状态与画面新鲜)，只是不累计、不触发
+                    # 计数累加期间跳过运动门控：阈值要求的是连续多帧的实际检测结果
+                    alerting = self.stranger_counter > 0 or self.absence_counter > 0
+                    with METRICS.timer("vision_get_status"):
+                        status = vision_mon.get_status(force=alerting)
+                    if status in ('safe', 'stranger', 'absence'):
+                        # 只记录第一次
+                        timer.mark("视觉: 首次画面判定，视觉保护生效")
+                        timer.mark("首个保护生效")
+
+                    if not vision_mon.fresh:
+                        # 画面静止沿用的上次结果 / 没有新画面：不计入连续帧
+                        pass
+
+                    elif status == 'stranger' and not cooling:
+                        self.stranger_counter += 1
+                        limit = int(self.settings.get('stranger_threshold', 3))
+                        self.callback_log(f"检测到陌生人 ({self.stranger_counter}/{limit})")
+                        if self.stranger_counter >= limit:
+                            self.stranger_counter = 0
+                            self.bus.publish('vision', "陌生人靠近", confidence=vision_mon.last_confidence)
+
+                    elif status == 'absence' and not cooling:
+                        self.absence_counter += 1
+                        limit = int(self.settings.get('absence_threshold', 5))
+                        self.callback_log(f"检测到离席 ({self.absence_counter}/{limit})")
+                        if self.absence_counter >= limit:
+                            self.absence_counter = 0
+                            # 检测器只给出有无人脸，离席没有可用的置信度
+                            self.bus.publish('vision', "用户离席")
+
+                    elif status == 'safe':
+                        self.stranger_counter = 0
+                        self.absence_counter = 0
+
+                if loop_start is not None:
+                    METRICS.observe("monitor_loop", time.perf_counter() - loop_start)
+
+                # 按固定节拍等待下一轮，计数累加时加快，持续安全时放慢
+                scheduler.update(status, alerting=self.stranger_counter > 0 or self.absence_counter > 0)
+                scheduler.wait()
+
+            # 清理 (仍在加载中的子系统等它加载完再释放)
+            if vision_future is not None:
+                vision_future.result()
+            if audio_future is not None:
+                audio_mon = audio_future.result()
+            if self.dispatcher: self.dispatcher.stop()
+            if vision_mon: vision_mon.stop_camera()
+            if audio_mon: audio_mon.stop()
+            self.audio_mon = None
+            self.callback_log("监控已停止。")
+
+        except Exception as e:
+            self.callback_log(f"致命错误: {e}")
+        finally:
+            if exporter:
+                self.metrics_snapshot = METRICS.snapshot()
+                self.callback_log(f"[指标] {METRICS.summary()}")
+                exporter.stop()
+                # 关闭统计：之后 (如在界面中关闭统计后重新启动) 各模块不再计时，也不带着上次的数据
+                METRICS.enabled = False
+                METRICS.reset()
+            self.callback_finished()
+
+    def _start_metrics(self):
+        """按配置开启各阶段耗时统计，返回导出器 (未开启时为 None)"""
+        METRICS.enabled = bool(self.settings.get('metrics_enabled', False))
+        if not METRICS.enabled:
+            return None
+        METRICS.reset()
+        return MetricsExporter(port=int(self.settings.get('metrics_port', 9464)),
+                               summary_interval=float(self.settings.get('metrics_summary_interval', 60)),
+                               callback_log=self.callback_log).start()
+
+    def _on_event(self, event):
+        """分发线程收到触发事件"""
+        METRICS.inc(f"monitor_events_{event.source}")
+        METRICS.observe("trigger_dispatch", time.monotonic() - event.timestamp)
+        self.trigger(event.reason, event)
+
+    def trigger(self, reason, event=None):
+        """
+        执行保护 (在分发线程中调用)
+        冷却期由分发线程记录：监控循环与各传感器照常运行，期间只是不再累计和触发
+        (冷却期内到达的触发事件由分发线程合并，计数由监控线程清零)
+        """
+        self.callback_log(f"!!! 触发保护: {reason} !!!")
+        self.callback_trigger(event)
+        self.callback_log(f"进入冷却模式 ({int(self.settings.get('cooling_time', 10))}s)...")
+
+    def pause(self):
+        """暂停：不再检测与触发 (语音监听线程保持运行，识别到的关键词被忽略)"""
+        if not self.paused:
+            self.paused = True
+            self.callback_log("监控已暂停。")
+
+    def resume(self):
+        if self.paused:
+            self.paused = False
+            self.callback_log("监控已恢复。")
+
+    def stop(self):
+        self.running = False
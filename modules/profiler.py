@@ -0,0 +1,155 @@
+import os
+import sys
+import time
+import threading
+from collections import Counter
+
+# 监控相关线程的名称 (其余线程的采样照常记录，只是日志汇总中不单独列出)
+MONITOR_THREADS = ("MainThread", "monitor", "frame-grabber", "audio-listen", "trigger-dispatch")
+
+
+class SamplingProfiler(threading.Thread):
+    """
+    跨线程采样分析器
+    按固定间隔用 sys._current_frames() 读取所有线程的调用栈并计数，被采样的线程无需任何改动
+    (识别、检测等重活在监控线程和语音监听线程中，cProfile 只能分析调用它的线程，因此用采样方式)
+    结束后输出 collapsed stack 文件 (每行 "线程;函数;函数... 次数")，可直接用 flamegraph.pl / speedscope 生成火焰图
+    注意：统计的是墙钟时间，阻塞等待 (如 queue.get、Event.wait) 的线程同样会被采到
+    """
+
+    def __init__(self, output_dir, duration=30, interval_ms=10, callback_log=print):
+        super().__init__(daemon=True, name="profiler")
+        self.output_dir = output_dir
+        self.duration = duration
+        self.interval = max(1, interval_ms) / 1000
+        self.callback_log = callback_log
+
+        self.stacks = Counter()  # (线程名, 最外层函数, ..., 最内层函数) -> 采样次数
+        self.sample_count = 0
+        self.output_path = None
+        self._labels = {}  # 代码对象 -> 显示名，避免每次采样重复格式化
+        self._stop_event = threading.Event()
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            name = getattr(code, 'co_qualname', code.co_name)
+            label = f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(';', ',')
+            self._labels[code] = label
+        return label
+
+    def _stack(self, frame):
+        labels = []
+        while frame is not None:
+            labels.append(self._label(frame.f_code))
+            frame = frame.f_back
+        labels.reverse()
+        return tuple(labels)
+
+    def run(self):
+        own_ident = threading.get_ident()
+        names = {}
+        names_refresh = 0
+        wall_start = time.monotonic()
+        cpu_start = time.process_time()
+        deadline = wall_start + self.duration
+        self.callback_log(f"[性能采样] 开始，持续 {self.duration:g}s，间隔 {self.interval * 1000:g} ms")
+
+        while not self._stop_event.is_set():
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            # 线程名每秒刷新一次 (线程可能在采样期间启动或退出)
+            if now >= names_refresh:
+                names = {t.ident: t.name for t in threading.enumerate()}
+                names_refresh = now + 1.0
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                name = names.get(ident)
+                if name is None:
+                    # 采样开始后才启动的线程：立即刷新一次，查不到名字的线程 (如驱动回调线程) 用编号代替
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                    name = names.setdefault(ident, f"thread-{ident}")
+                self.stacks[(name,) + self._stack(frame)] += 1
+            # 不在等待期间持有被采样线程的栈帧
+            frame = None
+            self.sample_count += 1
+            self._stop_event.wait(self.interval)
+
+        wall = time.monotonic() - wall_start
+        cpu = time.process_time() - cpu_start
+        try:
+            self.output_path = self.write()
+        except OSError as e:
+            self.callback_log(f"[性能采样] 写入结果失败: {e}")
+            return
+        self.callback_log(f"[性能采样] 完成：{self.sample_count} 次采样，{wall:.1f}s 内进程 CPU 占用 "
+                          f"{cpu / wall * 100 if wall else 0:.0f}% (单核)，结果已保存到 {self.output_path}")
+        for line in self.top_frames():
+            self.callback_log(f"[性能采样]   {line}")
+
+    def write(self):
+        """写出 collapsed stack 文件，返回文件路径"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f"profile_{time.strftime('%Y%m%d_%H%M%S')}.collapsed")
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{';'.join(stack)} {count}\n")
+        return path
+
+    def top_frames(self, limit=3):
+        """监控相关线程各自最常出现在栈顶的函数 (占该线程采样次数的比例)"""
+        per_thread = {}
+        for stack, count in self.stacks.items():
+            if stack[0] in MONITOR_THREADS and len(stack) > 1:
+                per_thread.setdefault(stack[0], Counter())[stack[-1]] += count
+        lines = []
+        for thread_name in MONITOR_THREADS:
+            leaves = per_thread.get(thread_name)
+            if not leaves:
+                continue
+            total = sum(leaves.values())
+            detail = ", ".join(f"{label} {count / total * 100:.0f}%" for label, count in leaves.most_common(limit))
+            lines.append(f"{thread_name}: {detail}")
+        return lines
+
+    def stop(self):
+        """提前结束采样 (已采集的数据照常写出)"""
+        self._stop_event.set()
+
+
+_lock = threading.Lock()
+_active = None
+
+
+def start_profiler(output_dir, duration=30, interval_ms=10, callback_log=print):
+    """
+    启动一次采样 (同一时间只运行一个)
+    :return: 新启动的采样器；已有采样在进行时返回 None
+    """
+    global _active
+    with _lock:
+        if _active is not None and _active.is_alive():
+            callback_log("[性能采样] 已有采样正在进行")
+            return None
+        _active = SamplingProfiler(output_dir, duration, interval_ms, callback_log)
+        _active.start()
+        return _active
+
+
+def stop_profiler():
+    """结束正在进行的采样，没有时返回 False"""
+    with _lock:
+        if _active is None or not _active.is_alive():
+            return False
+        _active.stop()
+        return True
+
+
+def toggle_profiler(output_dir, duration=30, interval_ms=10, callback_log=print):
+    """未在采样时开始采样，正在采样时提前结束 (供热键使用)"""
+    if stop_profiler():
+        callback_log("[性能采样] 提前结束，正在写出结果...")
+        return None
+    return start_profiler(output_dir, duration, interval_ms, callback_log)
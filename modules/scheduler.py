@@ -0,0 +1,86 @@
+import time
+
+
+class SampleScheduler:
+    """
+    监控主循环的采样节奏控制
+    - 以单调时钟的截止时间为准，保持固定节拍 (周期不会变成 工作耗时 + 间隔)
+    - 本人持续在座 ('safe') 一段时间后放慢采样，节省 CPU
+    - 陌生人/离席计数正在累加时加快采样，更快确认威胁
+    """
+
+    def __init__(self, base_interval=0.2, idle_interval=1.0, alert_interval=0.1, idle_after=30.0):
+        """
+        :param base_interval: 常规采样间隔(秒)
+        :param idle_interval: 持续安全时的采样间隔(秒)
+        :param alert_interval: 计数累加中的采样间隔(秒)
+        :param idle_after: 连续安全多少秒后进入空闲节奏
+        """
+        self.base_interval = float(base_interval)
+        self.idle_interval = max(self.base_interval, float(idle_interval))
+        self.alert_interval = min(self.base_interval, float(alert_interval))
+        self.idle_after = float(idle_after)
+
+        self.mode = 'normal'
+        self.interval = self.base_interval
+        self.safe_since = None
+        self.next_deadline = None
+
+        # 统计：循环次数、超时 (工作耗时超过间隔) 次数
+        self.ticks = 0
+        self.overruns = 0
+
+    def reset(self):
+        """暂停/冷却结束后调用，重新开始计时"""
+        self.safe_since = None
+        self.next_deadline = None
+        self._set_mode('normal')
+
+    def update(self, status, alerting):
+        """
+        根据本轮结果决定下一轮的采样节奏
+        :param status: 视觉状态 ('safe' / 'stranger' / 'absence' / ...)，无视觉时为 None
+        :param alerting: 是否有威胁计数正在累加
+        """
+        now = time.monotonic()
+        if alerting:
+            self.safe_since = None
+            self._set_mode('alert')
+            return
+
+        if status == 'safe':
+            if self.safe_since is None:
+                self.safe_since = now
+        elif status != 'pending':
+            # 'pending' 只是还没有新画面，不打断连续安全的计时
+            self.safe_since = None
+
+        if self.safe_since is not None and now - self.safe_since >= self.idle_after:
+            self._set_mode('idle')
+        else:
+            self._set_mode('normal')
+
+    def _set_mode(self, mode):
+        if mode == self.mode:
+            return
+        print(f"[Scheduler] 采样节奏: {self.mode} -> {mode}")
+        self.mode = mode
+        self.interval = {
+            'idle': self.idle_interval,
+            'alert': self.alert_interval,
+        }.get(mode, self.base_interval)
+
+    def wait(self):
+        """睡眠到下一个截止时间；若本轮已经超时，则立即开始下一轮且不补偿积压的节拍"""
+        now = time.monotonic()
+        if self.next_deadline is None:
+            self.next_deadline = now
+        self.next_deadline += self.interval
+        self.ticks += 1
+
+        remaining = self.next_deadline - now
+        if remaining > 0:
+            time.sleep(remaining)
+        else:
+            self.overruns += 1
+            self.next_deadline = now
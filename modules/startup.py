@@ -0,0 +1,36 @@
+import time
+import threading
+
+
+class PhaseTimer:
+    """
+    启动阶段计时
+    记录从启动监控开始到各子系统就绪 / 首次可触发保护的耗时，并写入日志
+    """
+
+    def __init__(self, callback_log=print, label="启动"):
+        self.callback_log = callback_log
+        self.label = label
+        self.start = time.monotonic()
+        self.phases = {}
+        self._lock = threading.Lock()
+
+    def mark(self, phase, once=True):
+        """
+        记录一个阶段完成
+        :param once: 为 True 时同名阶段只记录第一次
+        :return: 距启动的秒数
+        """
+        elapsed = time.monotonic() - self.start
+        with self._lock:
+            if once and phase in self.phases:
+                return self.phases[phase]
+            self.phases[phase] = elapsed
+        self.callback_log(f"[{self.label}] {phase}: {elapsed * 1000:.0f} ms")
+        return elapsed
+
+    def summary(self):
+        """按完成先后排列的各阶段耗时"""
+        with self._lock:
+            items = sorted(self.phases.items(), key=lambda kv: kv[1])
+        return ", ".join(f"{name} {t * 1000:.0f} ms" for name, t in items)
@@ -0,0 +1,192 @@
+import numpy as np
+
+
+def pcm_to_samples(data):
+    """16bit 小端 PCM 字节串 -> float32 数组 (数值范围与原始整数相同)"""
+    return np.frombuffer(data, dtype=np.int16).astype(np.float32)
+
+
+def rms(data):
+    """
+    计算 16bit PCM 的均方根能量，结果与 audioop.rms(data, 2) 一致
+    (audioop 已在 Python 3.13 中移除)
+    """
+    samples = pcm_to_samples(data)
+    if samples.size == 0:
+        return 0
+    return int(np.sqrt(np.mean(samples * samples)))
+
+
+class NoiseFloorTracker:
+    """
+    持续估计背景噪声底 (不占用麦克风、不阻塞)
+    - 记录最近一段时间 (默认 30 秒) 每个分析帧的能量，取低百分位数 (默认 10%) 作为噪声底
+    - 说话只占一部分时间，低百分位基本只反映背景噪声；环境变吵 / 变安静后，门限在一个窗口内跟上
+    - 门限 = 噪声底 * ratio，并限制在 [min_threshold, max_threshold] 内
+    """
+
+    def __init__(self, frame_ms=20, window_seconds=30.0, percentile=10, ratio=2.5,
+                 min_threshold=100, max_threshold=3000, warmup_seconds=1.0):
+        """
+        :param frame_ms: 每个能量值对应的帧长 (毫秒)，与 VAD 分析帧一致
+        :param window_seconds: 统计窗口长度 (秒)
+        :param percentile: 取窗口内能量的第几百分位作为噪声底
+        :param ratio: 门限相对噪声底的倍数
+        :param warmup_seconds: 窗口内至少积累多少秒的数据后才开始给出门限
+        """
+        self.percentile = percentile
+        self.ratio = ratio
+        self.min_threshold = min_threshold
+        self.max_threshold = max_threshold
+        self.warmup_frames = max(1, int(warmup_seconds * 1000 / frame_ms))
+
+        # 环形缓冲区
+        self._energies = np.zeros(max(1, int(window_seconds * 1000 / frame_ms)), dtype=np.float32)
+        self._pos = 0
+        self._count = 0
+
+        self.floor = None
+        self.threshold = None
+
+    def reset(self):
+        self._pos = 0
+        self._count = 0
+        self.floor = None
+        self.threshold = None
+
+    def update(self, energies):
+        """
+        加入一批帧能量
+        :return: 当前建议门限，数据不足时返回 None
+        """
+        size = self._energies.size
+        energies = np.asarray(energies, dtype=np.float32)[-size:]
+        n = energies.size
+        if n == 0:
+            return self.threshold
+
+        end = self._pos + n
+        if end <= size:
+            self._energies[self._pos:end] = energies
+        else:
+            split = size - self._pos
+            self._energies[self._pos:] = energies[:split]
+            self._energies[:n - split] = energies[split:]
+        self._pos = end % size
+        self._count = min(self._count + n, size)
+
+        if self._count < self.warmup_frames:
+            return None
+
+        self.floor = float(np.percentile(self._energies[:self._count], self.percentile))
+        self.threshold = min(max(self.floor * self.ratio, self.min_threshold), self.max_threshold)
+        return self.threshold
+
+
+class VoiceActivityDetector:
+    """
+    语音活动检测 (VAD)
+    - 将每个音频块切成 20ms 小帧，向量化计算 能量 / 过零率 / 频谱平坦度
+    - 能量过门限、且频谱不平坦 (非宽带噪声)、过零率不过高 的帧视为语音帧
+    - 检测到语音起点时，连同之前约 300ms 的预录音频一起送出，避免丢失首字
+    - 语音结束后保持一段拖尾 (hangover)，避免句中停顿把语音切碎
+    - 静音期间不输出任何数据，识别器可以整段跳过
+    - 可选接入 NoiseFloorTracker，能量门限随背景噪声自动调整
+    """
+
+    def __init__(self, energy_threshold, sample_rate=16000, frame_ms=20, hangover_ms=400, preroll_ms=300,
+                 min_speech_frames=2, flatness_max=0.5, zcr_max=0.35, noise_tracker=None):
+        """
+        :param energy_threshold: 能量门限 (与 audioop.rms 量纲一致)；启用噪声跟踪时作为初始门限
+        :param frame_ms: 分析帧长 (毫秒)
+        :param hangover_ms: 语音结束后继续送出音频的时长 (毫秒)
+        :param preroll_ms: 语音起点前预录的时长 (毫秒)
+        :param min_speech_frames: 一个音频块中至少多少个语音帧才算语音起点 (过滤按键等瞬时声)
+        :param flatness_max: 频谱平坦度上限 (0-1)，越接近 1 越像白噪声
+        :param zcr_max: 过零率上限 (0-1)
+        :param noise_tracker: NoiseFloorTracker 实例，为 None 时门限固定
+        """
+        self.energy_threshold = float(energy_threshold)
+        self.sample_rate = sample_rate
+        self.frame_len = int(sample_rate * frame_ms / 1000)
+        self.hangover_samples = int(sample_rate * hangover_ms / 1000)
+        self.preroll_bytes = int(sample_rate * preroll_ms / 1000) * 2
+        self.min_speech_frames = min_speech_frames
+        self.flatness_max = flatness_max
+        self.zcr_max = zcr_max
+        self.noise_tracker = noise_tracker
+
+        self.in_speech = False
+        self.hangover_left = 0
+        self._preroll = b""
+
+        # 最近一个音频块的能量，供噪声估计和界面显示使用
+        self.last_rms = 0.0
+
+    def reset(self):
+        self.in_speech = False
+        self.hangover_left = 0
+        self._preroll = b""
+
+    def frame_features(self, samples):
+        """
+        逐帧计算特征
+        :return: (能量 RMS, 过零率, 频谱平坦度)，均为长度为帧数的数组
+        """
+        n_frames = samples.size // self.frame_len
+        frames = samples[:n_frames * self.frame_len].reshape(n_frames, self.frame_len)
+
+        energy = np.sqrt(np.mean(frames * frames, axis=1))
+
+        signs = np.signbit(frames)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (self.frame_len - 1)
+
+        power = np.abs(np.fft.rfft(frames, axis=1)) ** 2 + 1e-10
+        flatness = np.exp(np.mean(np.log(power), axis=1)) / np.mean(power, axis=1)
+        return energy, zcr, flatness
+
+    def speech_frames(self, samples):
+        """返回每一帧是否为语音的布尔数组"""
+        energy, zcr, flatness = self.frame_features(samples)
+        if self.noise_tracker is not None:
+            # 复用已算好的帧能量更新噪声底
+            threshold = self.noise_tracker.update(energy)
+            if threshold is not None:
+                self.energy_threshold = threshold
+        return (energy >= self.energy_threshold) & (flatness < self.flatness_max) & (zcr < self.zcr_max)
+
+    def process(self, data):
+        """
+        处理一个音频块
+        :param data: 16bit PCM 字节串
+        :return: 需要送入识别器的字节串 (语音起点时包含预录音频)，静音时返回 None
+        """
+        samples = pcm_to_samples(data)
+        if samples.size == 0:
+            return None
+        self.last_rms = float(np.sqrt(np.mean(samples * samples)))
+
+        voiced = 0
+        if samples.size >= self.frame_len:
+            voiced = int(np.count_nonzero(self.speech_frames(samples)))
+
+        if voiced >= self.min_speech_frames or (self.in_speech and voiced > 0):
+            self.hangover_left = self.hangover_samples
+            if not self.in_speech:
+                # 语音起点：补上预录音频
+                self.in_speech = True
+                output = self._preroll + data
+                self._preroll = b""
+                return output
+            return data
+
+        if self.in_speech:
+            # 拖尾期间继续送出，结束后回到静音状态
+            self.hangover_left -= samples.size
+            if self.hangover_left > 0:
+                return data
+            self.in_speech = False
+
+        # 静音：只保留最近一段作为预录
+        self._preroll = (self._preroll + data)[-self.preroll_bytes:] if self.preroll_bytes else b""
+        return None
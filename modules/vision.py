@@ -1,112 +1,633 @@
-import face_recognition
-import cv2
 import numpy as np
+import io
 import os
+import time
+import importlib.metadata
+from modules.lazy import lazy_import
+from modules.capture import FrameGrabber, FramePreprocessor
+from modules.face_cache import FaceEncodingCache, encoding_cache_key
+from modules.detectors import create_detector
+from modules.metrics import METRICS
+
+# dlib 及其模型文件导入很慢，首次使用时才加载
+face_recognition = lazy_import("face_recognition")
+
+# 用户照片的检测/编码参数 (同时作为特征缓存键的一部分，另加 face_recognition 版本，见 encoding_params)
+ENCODING_PARAMS = {
+    "detector": "hog",
+    "upsample": 1,
+    "num_jitters": 1,
+    "landmarks": "small",
+}
+
+
+def encoding_params():
+    """
+    特征缓存键使用的完整参数
+    版本号从安装信息读取，缓存命中时无需导入 face_recognition / dlib
+    """
+    try:
+        version = importlib.metadata.version("face_recognition")
+    except importlib.metadata.PackageNotFoundError:
+        version = 'unknown'
+    return dict(ENCODING_PARAMS, face_recognition=version)
+
+
+def box_iou(box_a, box_b):
+    """
+    计算两个人脸框的交并比 (IoU)
+    人脸框格式与 face_recognition 一致: (top, right, bottom, left)
+    """
+    top = max(box_a[0], box_b[0])
+    right = min(box_a[1], box_b[1])
+    bottom = min(box_a[2], box_b[2])
+    left = max(box_a[3], box_b[3])
+
+    inter = max(0, right - left) * max(0, bottom - top)
+    area_a = (box_a[1] - box_a[3]) * (box_a[2] - box_a[0])
+    area_b = (box_b[1] - box_b[3]) * (box_b[2] - box_b[0])
+    union = area_a + area_b - inter
+    if union <= 0:
+        return 0.0
+    return inter / union
+
+
+# 运动检测使用的缩略图尺寸 (宽, 高)，足够小以保证差分几乎不耗 CPU
+MOTION_THUMB_SIZE = (64, 48)
+
+# 参考帧以来，缩略图中灰度变化超过 MOTION_PIXEL_DIFF 的像素在检测区域外 (未跟踪时为整帧) 至少有这么多个时，
+# 视为有人移动 (如身后有人靠近)：即使整帧平均差值很小也不走运动门控，并且本帧全帧扫描
+MOTION_PIXEL_DIFF = 25
+MOTION_OUTSIDE_PIXELS = 8
+
+# 检测区域的宽高按该像素对齐，区域大小小幅变化时仍可复用同一块缓冲区
+ROI_ALIGN = 32
+
+# 缩放后人脸高度低于该像素数时视为“小脸”，自动画质模式会临时提高清晰度
+SMALL_FACE_PIXELS = 60
+
+# 登记照片支持的图片格式
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+def expand_image_paths(paths):
+    """
+    将照片配置展开为图片文件列表
+    支持单个文件、文件夹 (取其中所有图片) 或二者混合的列表
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+
+    result = []
+    for path in paths or []:
+        if not path:
+            continue
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.lower().endswith(IMAGE_EXTENSIONS):
+                    result.append(os.path.join(path, name))
+        else:
+            result.append(path)
+    return result
+
+
+class ScaleController:
+    """
+    自动画质：根据单帧分析耗时自动调整 process_scale
+    - 平滑后的耗时超出目标一定比例 -> 降低缩放比例
+    - 明显低于目标 -> 提高缩放比例，利用空闲算力
+    调整后会等待若干帧再评估 (滞回)，避免在两个档位之间来回抖动
+    """
+
+    def __init__(self, target_latency, initial_scale=0.5, min_scale=0.25, max_scale=1.0,
+                 step=0.05, hysteresis=0.25, smoothing=0.3, settle_frames=5, boost_frames=10):
+        """
+        :param target_latency: 目标单帧分析耗时 (秒)
+        :param initial_scale: 初始缩放比例
+        :param step: 每次调整的幅度
+        :param hysteresis: 耗时偏离目标超过该比例才调整
+        :param smoothing: 耗时指数平滑系数 (0-1)，越大越跟随最新值
+        :param settle_frames: 每次调整后至少等待的帧数
+        :param boost_frames: 发现小脸后临时提高清晰度的帧数
+        """
+        self.target_latency = float(target_latency)
+        self.min_scale = min_scale
+        self.max_scale = max_scale
+        self.step = step
+        self.hysteresis = hysteresis
+        self.smoothing = smoothing
+        self.settle_frames = settle_frames
+        self.boost_frames = boost_frames
+
+        self.base_scale = min(max_scale, max(min_scale, float(initial_scale)))
+        self.avg_latency = None
+        self.frames_since_change = 0
+        self.boost_remaining = 0
+
+    @property
+    def scale(self):
+        """当前应使用的缩放比例 (含小脸临时提升)"""
+        if self.boost_remaining > 0:
+            return min(self.max_scale, round(self.base_scale + 2 * self.step, 2))
+        return self.base_scale
+
+    def request_boost(self):
+        """
+        人脸太小时调用，接下来若干帧使用更高的清晰度
+        提升进行中再次请求不会延长 (否则远处的人会让提升永不结束)
+        """
+        if self.boost_remaining <= 0:
+            self.boost_remaining = self.boost_frames
+
+    def update(self, latency):
+        """
+        记录一次全帧分析的耗时，必要时调整缩放比例
+        :return: 下一帧应使用的缩放比例
+        """
+        # 临时提升期间的耗时同样参与调整：提升后超出目标时基准画质也会降档，
+        # 小脸持续存在 (反复提升) 时 CPU 占用仍受目标耗时约束
+        if self.boost_remaining > 0:
+            self.boost_remaining -= 1
+
+        if self.avg_latency is None:
+            self.avg_latency = latency
+        else:
+            self.avg_latency += self.smoothing * (latency - self.avg_latency)
+
+        self.frames_since_change += 1
+        if self.frames_since_change < self.settle_frames:
+            return self.scale
+
+        new_scale = self.base_scale
+        if self.avg_latency > self.target_latency * (1 + self.hysteresis):
+            new_scale = max(self.min_scale, self.base_scale - self.step)
+        elif self.avg_latency < self.target_latency * (1 - self.hysteresis):
+            new_scale = min(self.max_scale, self.base_scale + self.step)
+
+        new_scale = round(new_scale, 2)
+        if new_scale != self.base_scale:
+            print(f"[Vision] 自动画质: {self.base_scale} -> {new_scale} "
+                  f"(平均耗时 {self.avg_latency * 1000:.0f}ms, 目标 {self.target_latency * 1000:.0f}ms)")
+            self.base_scale = new_scale
+            self.frames_since_change = 0
+            # 换档后耗时会明显变化，重新开始平滑
+            self.avg_latency = None
+        return self.scale
 
 
 class VisionMonitor:
-    def __init__(self, user_image_path, tolerance=0.6, camera_index=0, process_scale=0.5):
+    def __init__(self, user_image_path, tolerance=0.6, camera_index=0, process_scale=0.5,
+                 reverify_interval=3.0, track_iou_threshold=0.5, cache_dir=None, profiles=None,
+                 motion_threshold=4.0, motion_refresh_interval=5.0,
+                 roi_sweep_seconds=2.0, roi_expand=1.0, roi_scale=1.0,
+                 detector="hog", yunet_model_path=None, target_latency=None, defer_profiles=False):
         """
         初始化视觉监控模块
-        :param user_image_path: 用户照片路径
+        :param user_image_path: 用户照片路径 (文件、文件夹或它们的列表，多张照片可提高识别率)
         :param tolerance: 识别容差 (0.1-1.0)，越低越严格
-        :param camera_index: 摄像头索引
+        :param camera_index: 摄像头索引，也可以是视频文件路径 (代替摄像头，用于离线测试)
         :param process_scale: 图片缩放比例 (0.25-1.0)，越高越清晰越慢
+        :param reverify_interval: 跟踪模式下强制重新比对人脸特征的间隔(秒)，<=0 表示每帧都比对
+        :param track_iou_threshold: 相邻两帧人脸框的最小交并比，低于此值视为跟踪丢失
+        :param cache_dir: 用户人脸特征缓存目录，None 表示不使用缓存
+        :param profiles: 额外的授权人员列表，每项为 {"name": 名字, "images": 照片路径, "tolerance": 可选容差}
+        :param motion_threshold: 画面变化门限 (缩略灰度图平均差值 0-255)，低于此值沿用上次结果，<=0 关闭
+        :param motion_refresh_interval: 画面静止时强制完整检测的间隔(秒)
+        :param roi_sweep_seconds: 跟踪本人时，每隔多少秒做一次全帧扫描 (其余帧只检测人脸附近区域)，<=0 关闭区域检测
+                                  另外，区域外有画面变化、或运动门控放行的第一帧也会全帧扫描
+        :param roi_expand: 检测区域相对人脸框在每一侧外扩的比例
+        :param roi_scale: 检测区域的缩放比例，区域较小，通常可保持 1.0 原图清晰度
+        :param detector: 人脸检测后端 'hog' / 'haar' / 'yunet' / 'cascade'，见 modules.detectors
+        :param yunet_model_path: YuNet 模型文件路径 (仅 detector='yunet' 时需要)
+        :param target_latency: 自动画质的目标单帧分析耗时(秒)，设置后 process_scale 仅作为初始值，None 表示固定画质
+        :param defer_profiles: 为 True 时构造函数不加载照片，由调用方稍后 (可在其它线程) 调用 load_pending_profiles，
+                               以便照片编码与摄像头打开、语音模型加载并行进行
         """
         self.tolerance = float(tolerance)
         self.process_scale = float(process_scale)
+        self.reverify_interval = float(reverify_interval)
+        self.track_iou_threshold = float(track_iou_threshold)
 
-        try:
-            self.camera_index = int(camera_index)
-        except:
-            self.camera_index = 0
+        self.motion_threshold = float(motion_threshold)
+        self.motion_refresh_interval = float(motion_refresh_interval)
+
+        self.roi_sweep_seconds = float(roi_sweep_seconds)
+        self.roi_expand = float(roi_expand)
+        self.roi_scale = float(roi_scale)
+        self.detector = create_detector(detector, yunet_model_path=yunet_model_path)
+        self.scale_controller = None
+        if target_latency:
+            self.scale_controller = ScaleController(target_latency, initial_scale=self.process_scale)
+            self.process_scale = self.scale_controller.scale
+
+        # 身份跟踪状态：已验证本人的上一帧人脸框 (整帧坐标) & 上次完整比对的时间
+        self.track_box = None
+        self.track_shift = 0.0
+        self.last_verify_time = 0.0
+        # 上次全帧扫描的时间，以及最近一次分析是否为全帧 (自动画质只参考全帧耗时)
+        self.last_sweep_time = 0.0
+        self.last_pass_full = False
+
+        # 运动门控状态：上次完整检测时的缩略图、结果和时间
+        self.motion_ref = None
+        self.last_status = None
+        self.last_full_time = 0.0
+        # 上次分析之后是否有帧被门控跳过
+        self.motion_gated = False
+        # 最近一次 get_status 的结果是否来自本帧的实际分析 (False 表示沿用了上次结果或没有新画面)
+        self.fresh = False
+
+        if isinstance(camera_index, str) and not camera_index.strip().isdigit():
+            self.camera_index = camera_index
+        else:
+            try:
+                self.camera_index = int(camera_index)
+            except:
+                self.camera_index = 0
+
+        # 所有登记照片的特征矩阵 (N, 128) float32，以及每一行对应的身份编号和容差
+        self.known_face_encodings = np.empty((0, 128), dtype=np.float32)
+        self.known_face_labels = np.empty(0, dtype=np.int32)
+        self.known_face_tolerances = np.empty(0, dtype=np.float32)
+        self.identity_names = []
+        # 最近一次完整比对的结果 (身份名, 距离)
+        self.last_match = None
+        # 最近一次分析判定为陌生人的置信度 (0-1)，随触发事件一起发布
+        self.last_confidence = None
 
-        self.known_face_encodings = []
         self.is_ready = False
+        self.encoding_cache = FaceEncodingCache(cache_dir) if cache_dir else None
+        self._encoding_params = encoding_params() if cache_dir else None
+
+        # 加载用户画像 (本人 + 其他授权人员)
+        all_profiles = [{"name": "本人", "images": user_image_path, "tolerance": self.tolerance}]
+        all_profiles.extend(profiles or [])
+        self._pending_profiles = all_profiles
+        if not defer_profiles:
+            self.load_pending_profiles()
+
+        # 初始化摄像头 (独立采集线程，get_status 只取最新帧)
+        self.preprocessor = FramePreprocessor()
+        self.grabber = None
+        self.last_frame_seq = 0
+        self.last_frame_time = 0.0
+
+    @property
+    def has_pending_images(self):
+        """是否有待加载的照片 (没有配置照片时无需打开摄像头)"""
+        profiles = self._pending_profiles or []
+        return any(os.path.exists(path) for p in profiles for path in expand_image_paths(p.get("images")))
 
-        # 加载用户画像
-        self.load_user_profile(user_image_path)
+    def load_pending_profiles(self):
+        """加载构造时传入的授权人员照片 (defer_profiles=True 时由调用方调用)"""
+        profiles, self._pending_profiles = self._pending_profiles, None
+        if profiles:
+            self.load_profiles(profiles)
+        return self.is_ready
 
-        # 初始化摄像头
-        self.video_capture = None
+    def load_profiles(self, profiles):
+        """加载所有授权人员的照片，合并为一个连续的特征矩阵"""
+        rows, labels, tolerances = [], [], []
+        self.identity_names = []
+
+        for profile in profiles:
+            name = profile.get("name") or f"用户{len(self.identity_names) + 1}"
+            tolerance = float(profile.get("tolerance") or self.tolerance)
+            identity = len(self.identity_names)
+            self.identity_names.append(name)
+
+            count = 0
+            for path in expand_image_paths(profile.get("images")):
+                encoding = self.load_user_profile(path)
+                if encoding is not None:
+                    rows.append(encoding)
+                    labels.append(identity)
+                    tolerances.append(tolerance)
+                    count += 1
+            print(f"[{name}] 已登记 {count} 张照片 (容差: {tolerance})")
+
+        if self.encoding_cache:
+            removed = self.encoding_cache.prune()
+            if removed:
+                print(f"[FaceCache] 已清理 {removed} 个过期的缓存文件")
+
+        if rows:
+            self.known_face_encodings = np.ascontiguousarray(np.vstack(rows), dtype=np.float32)
+            self.known_face_labels = np.asarray(labels, dtype=np.int32)
+            self.known_face_tolerances = np.asarray(tolerances, dtype=np.float32)
+            self.is_ready = True
+            print(f"用户人脸特征加载成功，共 {len(rows)} 条特征。")
 
     def load_user_profile(self, path):
-        """加载并编码用户人脸"""
+        """加载并编码单张照片中的人脸，返回 128 维特征，失败返回 None"""
         if not os.path.exists(path):
             print(f"错误: 找不到用户照片 {path}")
-            return
+            return None
 
         try:
-            print("正在加载用户人脸特征...")
-            user_image = face_recognition.load_image_file(path)
-            encodings = face_recognition.face_encodings(user_image)
+            with open(path, 'rb') as f:
+                image_bytes = f.read()
 
-            if len(encodings) > 0:
-                self.known_face_encodings = [encodings[0]]
-                self.is_ready = True
-                print("用户人脸特征加载成功。")
+            cache_key = encoding_cache_key(image_bytes, self._encoding_params)
+            encodings = self.encoding_cache.load(cache_key) if self.encoding_cache else None
+
+            if encodings is not None:
+                print(f"已从缓存加载人脸特征: {path}")
             else:
-                print("错误: 照片中未检测到人脸，请更换清晰的正脸照片。")
+                print(f"正在加载人脸特征: {path} ...")
+                encodings = self._encode_image(image_bytes)
+                if self.encoding_cache:
+                    self.encoding_cache.save(cache_key, encodings)
+
+            if len(encodings) > 0:
+                return encodings[0]
+            print(f"错误: 照片中未检测到人脸，请更换清晰的正脸照片: {path}")
         except Exception as e:
             print(f"人脸处理异常: {e}")
+        return None
+
+    def match_face(self, face_encoding):
+        """
+        将一张人脸与所有登记特征做一次向量化比对
+        :return: (是否授权, 身份名, 距离)
+        """
+        query = np.asarray(face_encoding, dtype=np.float32)
+        distances = np.linalg.norm(self.known_face_encodings - query, axis=1)
+        # 按各自容差归一后取最优，容差不同的身份之间也能公平比较
+        margins = distances - self.known_face_tolerances
+        best = int(np.argmin(margins))
+        name = self.identity_names[self.known_face_labels[best]]
+        return bool(margins[best] <= 0), name, float(distances[best])
+
+    @staticmethod
+    def _encode_image(image_bytes):
+        """对照片执行完整的 检测 + 关键点 + 编码 流程"""
+        user_image = face_recognition.load_image_file(io.BytesIO(image_bytes))
+        locations = face_recognition.face_locations(
+            user_image,
+            number_of_times_to_upsample=ENCODING_PARAMS["upsample"],
+            model=ENCODING_PARAMS["detector"])
+        return face_recognition.face_encodings(
+            user_image, locations,
+            num_jitters=ENCODING_PARAMS["num_jitters"],
+            model=ENCODING_PARAMS["landmarks"])
 
     def start_camera(self):
-        if self.video_capture is None or not self.video_capture.isOpened():
-            self.video_capture = cv2.VideoCapture(self.camera_index, cv2.CAP_DSHOW)
+        if self.grabber is None or not self.grabber.is_alive():
+            self.grabber = FrameGrabber(self.camera_index)
+            self.grabber.start()
+            self.last_frame_seq = 0
 
     def stop_camera(self):
-        if self.video_capture and self.video_capture.isOpened():
-            self.video_capture.release()
-            self.video_capture = None
+        if self.grabber:
+            self.grabber.stop()
+            self.grabber = None
+        self.reset_track()
+        self.motion_ref = None
+        self.last_status = None
 
-    def get_status(self):
+    def reset_track(self):
+        """丢弃身份跟踪状态，下一帧将重新全帧检测、提取特征并比对"""
+        self.track_box = None
+        self.track_shift = 0.0
+        self.last_verify_time = 0.0
+
+    def _is_tracked(self, face_location):
+        """
+        判断当前唯一的人脸是否为上一帧已验证的本人
+        条件：跟踪存在、未到重新比对时间、人脸框移动幅度不大
+        """
+        if self.track_box is None or self.reverify_interval <= 0:
+            return False
+        if time.monotonic() - self.last_verify_time >= self.reverify_interval:
+            return False
+        return box_iou(self.track_box, face_location) >= self.track_iou_threshold
+
+    def _scene_unchanged(self, thumb, now):
+        """
+        与上次完整检测时的画面相比，场景是否基本没变
+        与参考帧 (而不是上一帧) 比较，缓慢的累积变化最终也会超过门限
+        """
+        if self.motion_threshold <= 0 or self.motion_ref is None or self.last_status is None:
+            return False
+        if now - self.last_full_time >= self.motion_refresh_interval:
+            return False
+        return self.preprocessor.motion_score(thumb, self.motion_ref) < self.motion_threshold
+
+    def get_status(self, force=False):
         """
         检测当前帧状态
-        返回: 'safe' (本人在), 'stranger' (陌生人在), 'absence' (没人), 'error' (摄像头错误)
+        返回: 'safe' (本人在), 'stranger' (陌生人在), 'absence' (没人), 'error' (摄像头错误),
+              'pending' (采集线程还没有产生新画面，本次不做判断)
+        画面静止时沿用上次结果，此时 self.fresh 为 False，调用方不应把它当作新的一帧累计
+        :param force: 为 True 时跳过运动门控，每个新画面都实际分析 (如陌生人/离席计数累加期间)
         """
+        self.fresh = False
         if not self.is_ready:
             return 'error'
 
-        if self.video_capture is None or not self.video_capture.isOpened():
+        if self.grabber is None or not self.grabber.is_alive():
             self.start_camera()
 
-        ret, frame = self.video_capture.read()
-        if not ret:
+        if self.grabber.failed:
             print("无法读取摄像头画面")
+            self.stop_camera()
             return 'error'
 
-        # --- 使用动态配置的缩放比例 ---
-        # 为 1.0，表示保持原图大小（最清晰，但计算最慢）
-        scale = self.process_scale
-        small_frame = cv2.resize(frame, (0, 0), fx=scale, fy=scale)
+        # 非阻塞地取出尚未分析过的最新一帧
+        packet = self.grabber.get_latest(self.last_frame_seq)
+        if packet is None:
+            METRICS.inc("vision_pending")
+            return 'pending'
+        METRICS.inc("vision_frames")
+        self.last_frame_seq = packet.seq
+        self.last_frame_time = packet.timestamp
+        frame = packet.frame
+
+        # 运动门控：画面没有明显变化时沿用上次结果，跳过人脸检测
+        # 检测区域外的变化 (如身后有人靠近) 先于门控判断：这类变化可能很小，平均差值达不到门限
+        now = time.monotonic()
+        with METRICS.timer("vision_motion"):
+            thumb = self.preprocessor.motion_thumbnail(frame, MOTION_THUMB_SIZE)
+            outside = self._motion_outside_roi(thumb, frame.shape)
+            unchanged = not force and not outside and self._scene_unchanged(thumb, now)
+        if unchanged:
+            METRICS.inc("vision_motion_skipped")
+            self.motion_gated = True
+            return self.last_status
+
+        # 以下情况本帧必须全帧扫描，不能只看本人附近：
+        # - 检测区域外有明显的画面变化
+        # - 静止一段时间后画面变化 (门控放行) 或到了强制刷新时间：静止期间可能已有人停在区域外
+        full_sweep = (outside or self.motion_gated
+                      or (self.motion_threshold > 0 and now - self.last_full_time >= self.motion_refresh_interval))
+        self.motion_gated = False
 
-        # BGR 转 RGB
-        rgb_small_frame = small_frame[:, :, ::-1]
+        start = time.perf_counter()
+        status = self._analyze_frame(frame, full_sweep)
+        elapsed = time.perf_counter() - start
+        METRICS.observe("vision_analyze", elapsed)
+        METRICS.inc(f"vision_status_{status}")
+        # 自动画质只参考全帧检测的耗时 (区域检测使用独立的 roi_scale)
+        if self.scale_controller and self.last_pass_full:
+            self.process_scale = self.scale_controller.update(elapsed)
 
-        # 检测人脸位置和特征
-        face_locations = face_recognition.face_locations(rgb_small_frame)
-        face_encodings = face_recognition.face_encodings(rgb_small_frame, face_locations)
+        self.motion_ref = self.preprocessor.keep_reference(thumb)
+        self.last_status = status
+        self.last_full_time = now
+        self.fresh = True
+        return status
+
+    def _motion_outside_roi(self, thumb, frame_shape):
+        """
+        与参考帧相比，本人检测区域以外是否有明显的局部画面变化
+        没有跟踪本人时整帧都算作区域外 (空房间里远处有人出现，平均差值同样很小)
+        """
+        if self.motion_ref is None:
+            return False
+        changed = self.preprocessor.motion_diff(thumb, self.motion_ref) >= MOTION_PIXEL_DIFF
+        if self.track_box is None:
+            return int(np.count_nonzero(changed)) >= MOTION_OUTSIDE_PIXELS
+        # 检测区域换算到缩略图坐标 (向外取整)，区域内的变化属于本人的正常活动
+        top, right, bottom, left = self._roi_for_track(frame_shape)
+        scale_y = thumb.shape[0] / frame_shape[0]
+        scale_x = thumb.shape[1] / frame_shape[1]
+        inside = changed[int(top * scale_y):int(np.ceil(bottom * scale_y)),
+                         int(left * scale_x):int(np.ceil(right * scale_x))]
+        return int(np.count_nonzero(changed)) - int(np.count_nonzero(inside)) >= MOTION_OUTSIDE_PIXELS
+
+    def _roi_for_track(self, frame_shape):
+        """
+        根据上一帧的人脸框计算检测区域 (top, right, bottom, left)
+        在人脸框四周按比例外扩，并额外加上最近一次的移动量，移动越快区域越大
+        """
+        top, right, bottom, left = self.track_box
+        margin_x = int((right - left) * self.roi_expand + 2 * self.track_shift)
+        margin_y = int((bottom - top) * self.roi_expand + 2 * self.track_shift)
+        top, left = max(0, top - margin_y), max(0, left - margin_x)
+        # 宽高向上对齐，便于复用缓冲区
+        roi_w = -(-(right + margin_x - left) // ROI_ALIGN) * ROI_ALIGN
+        roi_h = -(-(bottom + margin_y - top) // ROI_ALIGN) * ROI_ALIGN
+        height, width = frame_shape[:2]
+        return top, min(width, left + roi_w), min(height, top + roi_h), left
+
+    def _detect_faces(self, frame, roi=None):
+        """
+        在整帧或指定区域内检测人脸
+        :return: (用于提取特征的 RGB 图, 图内人脸框列表, 图内人脸框 -> 整帧坐标的转换函数)
+        """
+        if roi is None:
+            # --- 全帧：使用动态配置的缩放比例 ---
+            # 为 1.0，表示保持原图大小（最清晰，但计算最慢）
+            region = frame
+            offset_y, offset_x = 0, 0
+            scale = self.process_scale
+            buffer_name = 'full'
+        else:
+            # --- 区域：人脸附近像素少，可以用更高的清晰度 ---
+            top, right, bottom, left = roi
+            region = frame[top:bottom, left:right]
+            offset_y, offset_x = top, left
+            scale = self.roi_scale
+            buffer_name = 'roi'
+
+        # 缩放 + BGR 转 RGB，写入预分配缓冲区 (连续内存，dlib 与 OpenCV 检测器都可直接使用)
+        with METRICS.timer("vision_preprocess"):
+            rgb_small_frame = self.preprocessor.to_rgb(region, scale, buffer_name)
+
+        # 检测人脸位置
+        with METRICS.timer("vision_detect"):
+            face_locations = self.detector.detect(rgb_small_frame)
+
+        def to_frame_box(location):
+            t, r, b, l = location
+            return (int(t / scale) + offset_y, int(r / scale) + offset_x,
+                    int(b / scale) + offset_y, int(l / scale) + offset_x)
+
+        return rgb_small_frame, face_locations, to_frame_box
+
+    def _update_track(self, frame_box):
+        """刷新跟踪框，并记录人脸中心的移动量用于下一帧的区域外扩"""
+        if self.track_box is not None:
+            old_t, old_r, old_b, old_l = self.track_box
+            t, r, b, l = frame_box
+            self.track_shift = max(abs((l + r) - (old_l + old_r)), abs((t + b) - (old_t + old_b))) / 2
+        self.track_box = frame_box
+
+    def _analyze_frame(self, frame, full_sweep=False):
+        """
+        对一帧画面执行完整的人脸检测与鉴权
+        :param full_sweep: 为 True 时跳过区域检测，直接全帧扫描
+        """
+        face_locations = None
+        now = time.monotonic()
+        self.last_confidence = None
+
+        # 本人被跟踪时只在其人脸附近检测，每隔若干秒做一次全帧扫描，防止漏掉身后靠近的人
+        self.last_pass_full = False
+        if (not full_sweep and self.track_box is not None and self.roi_sweep_seconds > 0
+                and now - self.last_sweep_time < self.roi_sweep_seconds):
+            roi = self._roi_for_track(frame.shape)
+            rgb_small_frame, face_locations, to_frame_box = self._detect_faces(frame, roi)
+            if len(face_locations) != 1:
+                # 区域内丢失或出现多人 -> 本帧回退到全帧检测
+                face_locations = None
+
+        if face_locations is None:
+            rgb_small_frame, face_locations, to_frame_box = self._detect_faces(frame)
+            self.last_sweep_time = now
+            self.last_pass_full = True
+
+            # 按常规画质缩放后人脸过小时识别不可靠，请求临时提高清晰度
+            if self.scale_controller:
+                for location in face_locations:
+                    top, _, bottom, _ = to_frame_box(location)
+                    if (bottom - top) * self.scale_controller.base_scale < SMALL_FACE_PIXELS:
+                        self.scale_controller.request_boost()
+                        break
 
         # 1. 没人 -> 离席
         if len(face_locations) == 0:
+            self.reset_track()
             return 'absence'
 
         # 2. 多人 -> 陌生人
         if len(face_locations) > 1:
             # 即使其中有一张脸是你，只要旁边还有人，环境就不安全
+            self.reset_track()
+            self.last_confidence = 1.0
             return 'stranger'
 
         # 3. 单人 -> 鉴权
-        # 取出唯一的那张脸特征
-        face_encoding = face_encodings[0]
+        face_location = face_locations[0]
+        frame_box = to_frame_box(face_location)
+
+        # 跟踪命中：同一张脸在原地附近，跳过昂贵的特征提取
+        if self._is_tracked(frame_box):
+            self._update_track(frame_box)
+            return 'safe'
+
+        # 只对唯一的那张脸提取特征
+        with METRICS.timer("vision_encode"):
+            face_encoding = face_recognition.face_encodings(rgb_small_frame, [face_location])[0]
 
         # 比对
-        matches = face_recognition.compare_faces(self.known_face_encodings, face_encoding, tolerance=self.tolerance)
+        with METRICS.timer("vision_match"):
+            matched, name, distance = self.match_face(face_encoding)
+        self.last_match = (name, distance)
 
-        if True in matches:
-            return 'safe'  # 是本人，且只有一人
+        if matched:
+            # 是授权人员，且只有一人 -> 开始/刷新跟踪
+            self._update_track(frame_box)
+            self.last_verify_time = time.monotonic()
+            return 'safe'
         else:
-            return 'stranger'  # 有一张脸，但不是你
+            # 有一张脸，但不是你：与最接近的登记人脸的距离越大，越确定是陌生人
+            self.reset_track()
+            self.last_confidence = min(1.0, float(distance))
+            return 'stranger'
 
     def __del__(self):
-        self.stop_camera()
\ No newline at end of file
+        # 构造函数中途失败时还没有 grabber
+        if hasattr(self, 'grabber'):
+            self.stop_camera()
\ No newline at end of file
@@ -31,20 +31,52 @@ DEFAULT_SETTINGS = {
     ],
 
     # 视觉设置
-    "user_image_path": "default_user.jpg",
+    "user_image_path": "default_user.jpg",  # 本人照片，可以是单个文件或存放多张照片的文件夹
+    # 其他授权人员 (共用工位时)，例: [{"name": "同事A", "images": ["a1.jpg", "a_dir"], "tolerance": 0.5}]
+    "user_profiles": [],
     "camera_index": 0,
     "tolerance": 0.6,  # 人脸识别阈值，越低越严格 (0.1 - 1.0)
     "stranger_threshold": 1,  # 陌生人连续判定帧数 (对应灵敏度)
     "absence_threshold": 10,  # 离席连续判定帧数 (对应灵敏度)
     "process_scale": 0.5,  # 图像处理缩放比例 (0.25 - 1.0)
+    "auto_scale": False,  # 自动画质：根据单帧耗时自动调整缩放比例 (process_scale 作为初始值)
+    "target_latency_ms": 120,  # 自动画质的目标单帧分析耗时(毫秒)
+    "face_reverify_interval": 3.0,  # 本人被跟踪时，重新比对人脸特征的间隔(秒)，0 表示每帧比对
+    "motion_threshold": 4.0,  # 画面变化门限，画面静止时跳过人脸检测，0 表示关闭
+    "motion_refresh_interval": 5.0,  # 画面静止时强制完整检测的间隔(秒)
+    "roi_sweep_seconds": 2.0,  # 跟踪本人时只检测人脸附近区域，每隔多少秒全帧扫描一次，0 表示关闭
+    "roi_scale": 1.0,  # 人脸附近区域的检测缩放比例
+    "face_detector": "hog",  # 人脸检测后端: hog / haar / yunet / cascade (Haar 过滤 + HOG 确认)
+    "yunet_model_path": "face_detection_yunet_2023mar.onnx",  # YuNet 模型文件 (需自行下载放在软件目录)
     # 语音设置
     "voice_keywords": "老板,来了",
-    "voice_energy_threshold": 300,  # 麦克风能量门限 (杂音过滤)
+    "voice_energy_threshold": 300,  # 麦克风能量门限 (杂音过滤)，自动跟踪时作为初始值
+    "voice_adaptive_threshold": True,  # 监控运行中持续跟踪环境噪音，自动调整能量门限
+    "noise_floor_ratio": 2.5,  # 自动门限 = 环境噪声底 * 该倍数
+    "voice_template_stage": False,  # 两级检测：先用关键词录音样本初筛，命中后才交给识别器确认
+    "keyword_template_dir": "keyword_templates",  # 关键词录音样本目录 (相对软件目录)
+    "template_threshold_scale": 1.3,  # 初筛门限倍数，越大越容易进入确认 (漏检多时调大)
+    "template_confirm_ms": 1500,  # 初筛命中后送入识别器确认的时长(毫秒)
+    "voice_grammar_mode": False,  # 关键词模式：只识别关键词，更省 CPU、误触更少 (关键词需为常见词)
+    "vad_hangover_ms": 400,  # 语音结束后继续识别的拖尾时长(毫秒)
+    "vad_preroll_ms": 300,  # 语音开始前一并送入识别的预录时长(毫秒)，防止丢失首字
+    "voice_chunk_ms": 100,  # 每个音频块的时长(毫秒)，越小关键词响应越快
 
     # 全局采样
     "sample_interval": 0.2,  # 检测间隔(秒)
+    "idle_sample_interval": 1.0,  # 本人持续在座时的检测间隔(秒)
+    "alert_sample_interval": 0.1,  # 陌生人/离席计数累加时的检测间隔(秒)
+    "idle_after": 30,  # 连续安全多少秒后切换到空闲检测间隔
     # 冷却时间(秒)
-    "cooldown_time": 10,
+    "cooling_time": 10,
+
+    # 性能统计 (排查卡顿用，平时关闭)
+    "metrics_enabled": False,  # 统计各阶段耗时
+    "metrics_port": 9464,  # 本机统计接口端口 (http://127.0.0.1:端口/metrics)，0 表示不开启接口
+    "metrics_summary_interval": 60,  # 每隔多少秒在日志中输出一行耗时汇总，0 表示不输出
+    "profiler_on_start": False,  # 启动监控时自动进行一次性能采样 (也可在界面按 Ctrl+Shift+P 开始/结束)
+    "profiler_seconds": 30,  # 每次性能采样的时长(秒)
+    "profiler_interval_ms": 10,  # 采样间隔(毫秒)，越小越精细、开销越大
 }
 
 
@@ -64,6 +96,17 @@ class SettingsManager:
                 # 自动补全缺失的字段
                 needs_save = False
 
+                # 旧版本默认配置中的冷却时间字段名为 cooldown_time，界面与监控实际读取的是 cooling_time
+                if 'cooldown_time' in data:
+                    legacy = data.pop('cooldown_time')
+                    data.setdefault('cooling_time', legacy)
+                    needs_save = True
+
+                # 旧版本按帧数设置全帧扫描间隔 (roi_sweep_interval)，与采样间隔相乘后可能长达数十秒，改为按秒设置
+                if 'roi_sweep_interval' in data:
+                    data.pop('roi_sweep_interval')
+                    needs_save = True
+
                 # 合并默认配置，防止新版本缺少字段
                 for key, val in DEFAULT_SETTINGS.items():
                     if key not in data:
@@ -0,0 +1,136 @@
+"""
+语音监听离线回放基准与准确率测试 (无需麦克风和界面，Linux 下可直接运行)
+
+用法:
+    python tools/bench_audio.py <WAV 文件或文件夹> [--model model] [--keywords 老板,来了]
+                                [--modes open,grammar] [--chunk-ms 100] [--energy-threshold 300] [--adaptive] [--realtime]
+                                [--templates keyword_templates]
+
+语料标注：与 WAV 同名的 .json 文件，例如 boss_01.wav 对应 boss_01.json:
+    {"keywords": [{"word": "老板", "time": 1.35}]}
+time 为关键词在音频中开始的秒数。没有标注文件的音频视为负样本 (任何命中都算误报)。
+非 16kHz / 多声道的 16bit WAV 会自动重采样。
+
+对每种识别模式输出：
+- 实时率 RTF (处理耗时 / 音频时长) 与每秒音频消耗的 CPU 时间
+- 关键词检测延迟 (检测时在音频流中的位置 - 标注时间)
+- 命中 / 漏检 / 误报
+- 识别器实际处理的音频占比 (两级检测 --templates 下应远小于 100%)
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vosk import SetLogLevel
+from modules.audio import AudioMonitor
+from modules.audio_source import WavFileSource
+
+# 检测位置晚于标注时间超过该秒数，不再视为同一次命中
+MAX_LATENCY = 3.0
+
+
+def load_labels(wav_path):
+    label_path = os.path.splitext(wav_path)[0] + ".json"
+    if not os.path.exists(label_path):
+        return []
+    with open(label_path, 'r', encoding='utf-8') as f:
+        return [(item["word"], float(item["time"])) for item in json.load(f).get("keywords", [])]
+
+
+def score(labels, detections):
+    """
+    按关键词与时间把检测结果对应到标注
+    :return: (命中延迟列表, 漏检数, 误报数)
+    """
+    latencies = []
+    unmatched = list(detections)
+    misses = 0
+    for word, t in labels:
+        match = next((d for d in unmatched if d[0] == word and t <= d[1] <= t + MAX_LATENCY), None)
+        if match is None:
+            misses += 1
+        else:
+            unmatched.remove(match)
+            latencies.append(match[1] - t)
+    return latencies, misses, len(unmatched)
+
+
+def replay(wav_path, args, grammar_mode):
+    """回放一个文件，返回 (音频时长, 墙钟耗时, CPU 耗时, 检测结果列表, 统计)"""
+    detections = []
+    source = WavFileSource(wav_path, realtime=args.realtime)
+    monitor = AudioMonitor(args.keywords, model_path=args.model, energy_threshold=args.energy_threshold,
+                           grammar_mode=grammar_mode, chunk_ms=args.chunk_ms, audio_source=source,
+                           adaptive_threshold=args.adaptive, template_dir=args.templates,
+                           on_detect=lambda kw, pos, conf: detections.append((kw, pos)))
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    try:
+        source.finished.wait()
+        monitor.flush()
+    finally:
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+        stats = monitor.get_stats()
+        monitor.stop()
+    return source.duration, wall, cpu, detections, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="语音监听离线回放基准")
+    parser.add_argument("corpus", help="WAV 文件或包含 WAV 的文件夹")
+    parser.add_argument("--model", default="model", help="Vosk 模型目录")
+    parser.add_argument("--keywords", default="老板,来了", help="英文逗号分隔的关键词")
+    parser.add_argument("--modes", default="open,grammar", help="要对比的识别模式: open (开放词表), grammar (关键词模式)")
+    parser.add_argument("--chunk-ms", type=int, default=100, help="音频块时长 (毫秒)")
+    parser.add_argument("--energy-threshold", type=int, default=300, help="能量门限")
+    parser.add_argument("--adaptive", action="store_true", help="自动跟踪环境噪音调整门限")
+    parser.add_argument("--templates", default=None, help="关键词录音样本目录，提供时启用两级检测")
+    parser.add_argument("--realtime", action="store_true", help="按真实时间节奏回放 (默认尽快回放)")
+    args = parser.parse_args()
+
+    SetLogLevel(-1)
+    if os.path.isdir(args.corpus):
+        files = sorted(os.path.join(args.corpus, f) for f in os.listdir(args.corpus) if f.lower().endswith(".wav"))
+    else:
+        files = [args.corpus]
+    if not files:
+        print("没有找到 WAV 文件")
+        return 1
+
+    for mode in [m.strip() for m in args.modes.split(',') if m.strip()]:
+        total_audio = total_wall = total_cpu = 0.0
+        latencies, hits, misses, false_alarms, dropped = [], 0, 0, 0, 0
+        total_decoded = 0.0
+
+        for path in files:
+            duration, wall, cpu, detections, stats = replay(path, args, grammar_mode=(mode == "grammar"))
+            file_latencies, file_misses, file_fa = score(load_labels(path), detections)
+            total_audio += duration
+            total_wall += wall
+            total_cpu += cpu
+            latencies += file_latencies
+            hits += len(file_latencies)
+            misses += file_misses
+            false_alarms += file_fa
+            dropped += stats["dropped_chunks"]
+            total_decoded += stats["decoded_seconds"]
+
+        print(f"\n===== 模式: {mode} ({len(files)} 个文件, 共 {total_audio:.1f}s 音频) =====")
+        if total_audio > 0:
+            print(f"RTF: {total_wall / total_audio:.3f}   每秒音频 CPU: {total_cpu / total_audio * 1000:.1f} ms   "
+                  f"识别器处理占比: {total_decoded / total_audio:.1%}")
+        print(f"命中: {hits}   漏检: {misses}   误报: {false_alarms}   丢弃音频块: {dropped}")
+        if latencies:
+            latencies.sort()
+            print(f"检测延迟: 平均 {sum(latencies) / len(latencies) * 1000:.0f} ms, "
+                  f"中位 {latencies[len(latencies) // 2] * 1000:.0f} ms, 最大 {latencies[-1] * 1000:.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
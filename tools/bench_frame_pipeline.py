@@ -0,0 +1,128 @@
+"""
+画面预处理内存分配对比 (旧流程 vs 预分配缓冲区)
+
+用法:
+    python tools/bench_frame_pipeline.py [视频文件] [--frames 300] [--scale 0.5] [--width 1280 --height 720]
+
+不传视频文件时使用随机生成的画面。
+旧流程：read() 新建整帧 -> cv2.resize 新建小图 -> [:, :, ::-1] 非连续视图 -> dlib 内部再拷贝一次
+新流程：read(image=buf) -> resize 写入 dst -> cvtColor 写入复用的连续 RGB 缓冲区
+输出每帧平均新分配的内存 (tracemalloc 统计) 以及新建数组次数
+"""
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.capture import FramePreprocessor
+
+MOTION_THUMB_SIZE = (64, 48)
+
+
+class FakeCapture:
+    """模拟摄像头：循环播放给定画面，支持 read(image=buf) 写入已有缓冲区"""
+
+    def __init__(self, frames):
+        self.frames = frames
+        self.index = 0
+
+    def read(self, image=None):
+        src = self.frames[self.index % len(self.frames)]
+        self.index += 1
+        if image is None or image.shape != src.shape:
+            return True, src.copy()
+        np.copyto(image, src)
+        return True, image
+
+
+def legacy_pipeline(cap, scale):
+    """改造前 get_status 的预处理流程"""
+    ret, frame = cap.read()
+    thumb = cv2.cvtColor(cv2.resize(frame, MOTION_THUMB_SIZE, interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+    small_frame = cv2.resize(frame, (0, 0), fx=scale, fy=scale)
+    rgb_small_frame = small_frame[:, :, ::-1]
+    # dlib 不接受负步长数组，内部会拷贝成连续内存
+    dlib_input = np.ascontiguousarray(rgb_small_frame)
+    return thumb, dlib_input
+
+
+class BufferedPipeline:
+    """改造后的预处理流程 (与 VisionMonitor 一致)"""
+
+    def __init__(self):
+        self.preprocessor = FramePreprocessor()
+        self.frame_buf = None
+        self.array_allocations = 0
+
+    def __call__(self, cap, scale):
+        ret, frame = cap.read(self.frame_buf)
+        if frame is not self.frame_buf:
+            self.frame_buf = frame
+            self.array_allocations += 1
+        thumb = self.preprocessor.motion_thumbnail(frame, MOTION_THUMB_SIZE)
+        rgb = self.preprocessor.to_rgb(frame, scale)
+        return thumb, rgb
+
+
+def measure(name, step, frames):
+    """运行 frames 帧，统计每帧新分配内存峰值与耗时"""
+    step()  # 预热，使缓冲区完成首次分配
+    tracemalloc.start()
+    peak_total = 0
+    start = time.perf_counter()
+    for _ in range(frames):
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        step()
+        _, peak = tracemalloc.get_traced_memory()
+        peak_total += peak - base
+    elapsed = time.perf_counter() - start
+    tracemalloc.stop()
+    print(f"{name:<10} 每帧分配峰值: {peak_total / frames / 1024:10.1f} KB   "
+          f"每帧耗时: {elapsed / frames * 1000:7.2f} ms (含 tracemalloc 开销)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="画面预处理内存分配对比")
+    parser.add_argument("video", nargs="?", help="视频文件 (可选)")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--scale", type=float, default=0.5)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    args = parser.parse_args()
+
+    frames = []
+    if args.video:
+        cap = cv2.VideoCapture(args.video)
+        while len(frames) < 30:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+        cap.release()
+    if not frames:
+        rng = np.random.default_rng(0)
+        frames = [rng.integers(0, 256, (args.height, args.width, 3), dtype=np.uint8) for _ in range(4)]
+
+    print(f"画面 {frames[0].shape[1]}x{frames[0].shape[0]}, 缩放 {args.scale}, {args.frames} 帧")
+
+    legacy_cap = FakeCapture(frames)
+    measure("旧流程", lambda: legacy_pipeline(legacy_cap, args.scale), args.frames)
+
+    buffered = BufferedPipeline()
+    buffered_cap = FakeCapture(frames)
+    measure("缓冲区", lambda: buffered(buffered_cap, args.scale), args.frames)
+
+    allocations = buffered.preprocessor.pool.allocations + buffered.array_allocations
+    print(f"缓冲区流程共分配数组 {allocations} 次 (仅首帧)，旧流程每帧新建 5 个数组 "
+          f"(整帧、缩略图、灰度图、缩放图、RGB 拷贝)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""
+启动导入耗时报告 (基于 python -X importtime)
+
+用法:
+    python tools/startup_report.py [--top 15]
+
+在子进程中先 import main_gui (界面显示前必须完成的导入)，再执行后台预热 (cv2 / face_recognition / vosk 等)，
+分别统计两部分的导入耗时：
+- 界面显示前：main_gui 的累计导入耗时，以及其中最慢的模块
+- 延迟到后台：各重量级依赖的导入耗时 (这部分不再阻塞窗口显示)
+如果某个重量级依赖出现在 "界面显示前" 的列表里，说明它又被某处在模块顶层导入了。
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from modules.lazy import HEAVY_MODULES
+
+# 预热部分用 warm_up 自己的计时：cv2 等包在 __init__ 中替换自身模块，-X importtime 统计不到它们的总耗时
+PROBE = ("import json, main_gui\n"
+         "from modules.lazy import warm_up\n"
+         "print(json.dumps(warm_up(callback_log=lambda msg: None)))\n")
+
+
+def parse_importtime(stderr):
+    """
+    解析 -X importtime 输出
+    :return: [(模块名, 缩进层级, 自身耗时us, 累计耗时us)]，按导入完成顺序
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        except ValueError:
+            continue
+        # "|" 后固定一个空格，之后每层缩进两个空格
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="启动导入耗时报告")
+    parser.add_argument("--top", type=int, default=15, help="列出界面显示前最慢的模块数")
+    args = parser.parse_args()
+
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", PROBE],
+                            cwd=ROOT, capture_output=True, text=True)
+    entries = parse_importtime(result.stderr)
+    if result.returncode != 0 or not entries:
+        print("子进程执行失败:")
+        print(result.stderr[-2000:])
+        return 1
+
+    # main_gui 是第一次顶层导入的终点，之前的都是界面显示前的导入
+    gui_index = next(i for i, e in enumerate(entries) if e[0] == "main_gui" and e[1] == 0)
+    before = entries[:gui_index + 1]
+
+    gui_total = entries[gui_index][3]
+    print(f"===== 界面显示前的导入: {gui_total / 1000:.0f} ms =====")
+    slowest = sorted((e for e in before if e[0] != "main_gui"), key=lambda e: e[2], reverse=True)[:args.top]
+    for name, _, self_us, cumulative_us in slowest:
+        print(f"  {self_us / 1000:8.1f} ms (累计 {cumulative_us / 1000:8.1f} ms)  {name}")
+
+    heavy_roots = {name.split('.')[0] for name in HEAVY_MODULES}
+    leaked = sorted({e[0] for e in before if e[0].split('.')[0] in heavy_roots})
+    if leaked:
+        print(f"  [警告] 以下重量级依赖仍在界面显示前导入: {', '.join(leaked)}")
+
+    # 预热阶段：warm_up 返回的 {模块名: 秒数} (未安装的模块不在其中)
+    deferred = json.loads(result.stdout.strip().splitlines()[-1])
+    deferred_total = sum(deferred.values()) * 1e6
+    print(f"\n===== 延迟到后台预热的导入: {deferred_total / 1000:.0f} ms =====")
+    for name, seconds in deferred.items():
+        print(f"  {seconds * 1000:8.1f} ms  {name}")
+    missing = [name for name in HEAVY_MODULES if name not in deferred]
+    if missing:
+        print(f"  (当前环境未安装: {', '.join(missing)})")
+
+    if deferred_total:
+        print(f"\n界面可提前约 {deferred_total / 1000:.0f} ms 显示 "
+              f"(全部在启动时导入需 {(gui_total + deferred_total) / 1000:.0f} ms)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())